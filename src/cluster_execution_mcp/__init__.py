@@ -13,10 +13,13 @@ from .config import (
     get_node,
     get_available_nodes,
     get_nodes_by_capability,
+    get_node_ids_by_capability,
     get_nodes_by_os,
     validate_node_id,
     validate_command,
+    is_dangerous_command,
     validate_ip,
+    validate_ip_batch,
     should_offload_command,
 )
 from .router import (
@@ -48,10 +51,13 @@ __all__ = [
     "get_node",
     "get_available_nodes",
     "get_nodes_by_capability",
+    "get_node_ids_by_capability",
     "get_nodes_by_os",
     "validate_node_id",
     "validate_command",
+    "is_dangerous_command",
     "validate_ip",
+    "validate_ip_batch",
     "should_offload_command",
     # Router
     "DistributedTaskRouter",
@@ -9,15 +9,19 @@ Cluster Topology (Marc's Agentic System):
 - mac-studio (orchestrator): macOS ARM64 - coordination, temporal workflows
 - macbook-air (researcher): macOS ARM64 - research, documentation
 """
+import ipaddress
 import platform
+import re
 import socket
 
 import logging
 import os
+from collections import defaultdict
 from dataclasses import dataclass, field
 from enum import Enum
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 
 
 def _get_storage_base() -> Path:
@@ -94,6 +98,9 @@ class ClusterConfig:
 
     # Cache Settings
     ip_cache_ttl: int = field(default_factory=lambda: int(os.getenv("CLUSTER_IP_CACHE_TTL", "300")))
+    ip_cache_negative_ttl: int = field(
+        default_factory=lambda: int(os.getenv("CLUSTER_IP_CACHE_NEGATIVE_TTL", "60"))
+    )
 
     # Network (defaults use RFC 5737 TEST-NET for documentation - set CLUSTER_* env vars for real network)
     gateway_ip: str = field(default_factory=lambda: os.getenv("CLUSTER_GATEWAY", "192.0.2.1"))
@@ -142,7 +149,17 @@ class NodeArch(Enum):
     ARM64 = "arm64"
 
 
-@dataclass
+# OS names accepted as aliases in requirement checks
+_OS_ALIASES: Dict[str, str] = {"darwin": "macos"}
+
+
+def _normalize_os(os_name: str) -> str:
+    """Lowercase an OS name and fold aliases (darwin -> macos)."""
+    os_lc = os_name.lower()
+    return _OS_ALIASES.get(os_lc, os_lc)
+
+
+@dataclass(frozen=True, slots=True)
 class ClusterNode:
     """Definition of a cluster node."""
     node_id: str
@@ -150,11 +167,22 @@ class ClusterNode:
     fallback_ip: str
     os: str
     arch: str
-    capabilities: List[str]
-    specialties: List[str]
+    capabilities: Tuple[str, ...]
+    specialties: Tuple[str, ...]
     max_tasks: int
     priority: int  # Lower = higher priority for offloading
 
+    # Lowercased forms computed once for requirement matching
+    _os_lc: str = field(init=False, repr=False, compare=False)
+    _arch_lc: str = field(init=False, repr=False, compare=False)
+    _caps_lc: frozenset = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Frozen dataclass: derived fields must bypass __setattr__
+        object.__setattr__(self, "_os_lc", _normalize_os(self.os))
+        object.__setattr__(self, "_arch_lc", self.arch.lower())
+        object.__setattr__(self, "_caps_lc", frozenset(c.lower() for c in self.capabilities))
+
     def matches_requirements(
         self,
         requires_os: Optional[str] = None,
@@ -162,25 +190,17 @@ class ClusterNode:
         requires_capabilities: Optional[List[str]] = None
     ) -> bool:
         """Check if node matches task requirements."""
-        # Check OS
-        if requires_os:
-            # Handle darwin/macos alias
-            node_os = self.os.lower()
-            required = requires_os.lower()
-            if required == "darwin":
-                required = "macos"
-            if node_os != required:
-                return False
+        # Check OS (handles darwin/macos alias)
+        if requires_os and _normalize_os(requires_os) != self._os_lc:
+            return False
 
         # Check architecture
-        if requires_arch and self.arch.lower() != requires_arch.lower():
+        if requires_arch and requires_arch.lower() != self._arch_lc:
             return False
 
         # Check capabilities
         if requires_capabilities:
-            node_caps = set(c.lower() for c in self.capabilities)
-            required_caps = set(c.lower() for c in requires_capabilities)
-            if not required_caps.issubset(node_caps):
+            if not self._caps_lc.issuperset(c.lower() for c in requires_capabilities):
                 return False
 
         return True
@@ -200,8 +220,8 @@ CLUSTER_NODES: Dict[str, ClusterNode] = {
         fallback_ip=os.getenv("CLUSTER_BUILDER_IP", "192.168.1.27"),
         os="linux",
         arch="x86_64",
-        capabilities=["docker", "podman", "raid", "nvme", "compilation", "testing", "tpu", "ollama"],
-        specialties=["compilation", "testing", "containerization", "benchmarking", "linux-builds"],
+        capabilities=("docker", "podman", "raid", "nvme", "compilation", "testing", "tpu", "ollama"),
+        specialties=("compilation", "testing", "containerization", "benchmarking", "linux-builds"),
         max_tasks=10,
         priority=3  # Offload target
     ),
@@ -212,8 +232,8 @@ CLUSTER_NODES: Dict[str, ClusterNode] = {
         fallback_ip=os.getenv("CLUSTER_ORCHESTRATOR_IP", "192.168.1.16"),
         os="macos",
         arch="arm64",
-        capabilities=["orchestration", "coordination", "temporal", "mlx-gpu", "arduino", "qdrant"],
-        specialties=["orchestration", "coordination", "monitoring", "temporal-workflows"],
+        capabilities=("orchestration", "coordination", "temporal", "mlx-gpu", "arduino", "qdrant"),
+        specialties=("orchestration", "coordination", "monitoring", "temporal-workflows"),
         max_tasks=5,
         priority=1  # Keep free - orchestrator
     ),
@@ -224,8 +244,8 @@ CLUSTER_NODES: Dict[str, ClusterNode] = {
         fallback_ip=os.getenv("CLUSTER_RESEARCHER_IP", "192.168.1.76"),
         os="macos",
         arch="arm64",
-        capabilities=["research", "documentation", "analysis", "mobile"],
-        specialties=["research", "documentation", "analysis", "mobile-operations"],
+        capabilities=("research", "documentation", "analysis", "mobile"),
+        specialties=("research", "documentation", "analysis", "mobile-operations"),
         max_tasks=3,
         priority=2
     ),
@@ -281,20 +301,40 @@ def get_all_node_aliases() -> Dict[str, str]:
     return NODE_ALIASES.copy()
 
 
+def _build_indexes() -> tuple[Dict[str, tuple], Dict[str, tuple]]:
+    """Build capability and OS reverse indexes over CLUSTER_NODES."""
+    by_capability: Dict[str, List[ClusterNode]] = defaultdict(list)
+    by_os: Dict[str, List[ClusterNode]] = defaultdict(list)
+    for node in CLUSTER_NODES.values():
+        for capability in node._caps_lc:
+            by_capability[capability].append(node)
+        by_os[node._os_lc].append(node)
+    return (
+        {k: tuple(v) for k, v in by_capability.items()},
+        {k: tuple(v) for k, v in by_os.items()},
+    )
+
+
+_BY_CAPABILITY, _BY_OS = _build_indexes()
+_IDS_BY_CAPABILITY: Dict[str, frozenset] = {
+    capability: frozenset(node.node_id for node in nodes)
+    for capability, nodes in _BY_CAPABILITY.items()
+}
+
+
 def get_nodes_by_capability(capability: str) -> List[ClusterNode]:
     """Get nodes that have a specific capability."""
-    return [
-        node for node in CLUSTER_NODES.values()
-        if capability.lower() in [c.lower() for c in node.capabilities]
-    ]
+    return list(_BY_CAPABILITY.get(capability.lower(), ()))
+
+
+def get_node_ids_by_capability(capability: str) -> frozenset:
+    """Get IDs of nodes that have a specific capability."""
+    return _IDS_BY_CAPABILITY.get(capability.lower(), frozenset())
 
 
 def get_nodes_by_os(os_type: str) -> List[ClusterNode]:
-    """Get nodes running specific OS."""
-    os_type = os_type.lower()
-    if os_type == "darwin":
-        os_type = "macos"
-    return [node for node in CLUSTER_NODES.values() if node.os.lower() == os_type]
+    """Get nodes running specific OS (darwin is treated as macos)."""
+    return list(_BY_OS.get(_normalize_os(os_type), ()))
 
 
 # =============================================================================
@@ -315,21 +355,19 @@ OFFLOAD_PATTERNS = [
 LOCAL_PATTERNS = ["ls", "pwd", "cd", "echo", "cat", "head", "tail", "which", "type"]
 
 
+# Compiled once so each check is a single case-insensitive scan
+_LOCAL_RE = re.compile("|".join(map(re.escape, LOCAL_PATTERNS)), re.IGNORECASE)
+_OFFLOAD_RE = re.compile("|".join(map(re.escape, OFFLOAD_PATTERNS)), re.IGNORECASE)
+
+
 def should_offload_command(command: str) -> bool:
     """Determine if command should be offloaded to another node."""
-    cmd_lower = command.lower()
-
     # Check simple patterns first
-    for pattern in LOCAL_PATTERNS:
-        if cmd_lower.startswith(pattern):
-            return False
+    if _LOCAL_RE.match(command):
+        return False
 
     # Check offload patterns
-    for pattern in OFFLOAD_PATTERNS:
-        if pattern in cmd_lower:
-            return True
-
-    return False
+    return _OFFLOAD_RE.search(command) is not None
 
 
 # =============================================================================
@@ -351,8 +389,15 @@ class TaskStatus(Enum):
 # Validation Functions
 # =============================================================================
 
+@lru_cache(maxsize=4096)
 def validate_node_id(node_id: str) -> tuple[bool, Optional[str]]:
-    """Validate that node_id is known (supports aliases)."""
+    """
+    Validate that node_id is known (supports aliases).
+
+    Results are memoized: code that edits CLUSTER_NODES or NODE_ALIASES at
+    runtime (tests patching the topology, say) must call
+    validate_node_id.cache_clear() afterwards.
+    """
     # Direct match
     if node_id in CLUSTER_NODES:
         return True, None
@@ -362,8 +407,9 @@ def validate_node_id(node_id: str) -> tuple[bool, Optional[str]]:
     if canonical_id in CLUSTER_NODES:
         return True, None
 
-    available = ", ".join(CLUSTER_NODES.keys())
-    aliases = ", ".join(k for k in NODE_ALIASES.keys() if k not in CLUSTER_NODES)
+    # Built per miss (then cached) so the listing tracks the current topology
+    available = ", ".join(CLUSTER_NODES)
+    aliases = ", ".join(k for k in NODE_ALIASES if k not in CLUSTER_NODES)
     return False, f"Unknown node: {node_id}. Available: {available} (aliases: {aliases})"
 
 
@@ -395,68 +441,115 @@ def get_remote_nodes() -> List[str]:
     return [n for n in CLUSTER_NODES.keys() if n != local]
 
 
+# Dangerous command patterns (basic protection), fused into one alternation
+# so a single scan classifies the command. Matched with search(), not match():
+# they can follow sudo, ';', '&&', xargs, etc., and a hit at position 0 ends
+# the scan immediately anyway
+_DANGEROUS_PATTERNS = (
+    r"rm\s+-rf\s+/",
+    r">\s*/dev/sda",
+    r"dd\s+if=/dev/zero\s+of=/dev/",
+    r":\(\)\s*\{\s*:\|:&\s*\};:",  # Fork bomb
+)
+_DANGEROUS_RE = re.compile(
+    "|".join(f"(?:{p})" for p in _DANGEROUS_PATTERNS),
+    re.IGNORECASE
+)
+# Every dangerous pattern contains one of these literals; commands without any
+# of them (the common case) skip the regex scan entirely
+_DANGER_KEYWORDS = ("rm", "/dev/", ":()")
+
+# Commands longer than this are rejected outright
+_MAX_COMMAND_LENGTH = 1_000_000
+
+# The command cache is bounded by entries and by key size, so it holds at most
+# _COMMAND_CACHE_SIZE * _CACHED_COMMAND_BYTES (4 MiB) of command text; longer
+# commands are scanned uncached, which costs a few microseconds per KiB
+_COMMAND_CACHE_SIZE = 4096
+_CACHED_COMMAND_BYTES = 1024
+
+
+def _is_cacheable(command: str) -> bool:
+    """Check whether memoizing command keeps the cache within its byte budget."""
+    # isascii() is O(1); other strings take up to 4 bytes per character
+    size = len(command) if command.isascii() else 4 * len(command)
+    return size <= _CACHED_COMMAND_BYTES
+
+
+@lru_cache(maxsize=_COMMAND_CACHE_SIZE)
+def _check_command(command: str) -> tuple[bool, Optional[str]]:
+    """Scan a non-empty command for dangerous patterns."""
+    lowered = command.lower()
+    if not any(k in lowered for k in _DANGER_KEYWORDS):
+        return True, None
+
+    match = _DANGEROUS_RE.search(command)
+    if match:
+        return False, f"Command contains dangerous pattern: {match.group(0)}"
+
+    return True, None
+
+
+def is_dangerous_command(command: str) -> bool:
+    """Check a command against the dangerous patterns only (no empty/length checks)."""
+    if not command:
+        return False
+    if not _is_cacheable(command):
+        return not _check_command.__wrapped__(command)[0]
+    return not _check_command(command)[0]
+
+
 def validate_command(command: str) -> tuple[bool, Optional[str]]:
     """Basic command validation."""
     if not command or not command.strip():
         return False, "Command cannot be empty"
 
-    # Check for dangerous patterns (basic protection)
-    dangerous_patterns = [
-        "rm -rf /",
-        "rm -rf /*",
-        "> /dev/sda",
-        "dd if=/dev/zero of=/dev/",
-        ":(){ :|:& };:",  # Fork bomb
-    ]
+    if len(command) > _MAX_COMMAND_LENGTH:
+        return False, f"Command exceeds maximum length of {_MAX_COMMAND_LENGTH} characters"
 
-    cmd_lower = command.lower()
-    for pattern in dangerous_patterns:
-        if pattern.lower() in cmd_lower:
-            return False, f"Command contains dangerous pattern: {pattern}"
+    if not _is_cacheable(command):
+        return _check_command.__wrapped__(command)
+    return _check_command(command)
 
-    return True, None
 
+# Networks that never identify a reachable cluster node, as inclusive integer
+# ranges so the check is a few int compares
+_REJECTED_RANGES = tuple(
+    (int(net.network_address), int(net.broadcast_address))
+    for net in (
+        ipaddress.ip_network("127.0.0.0/8"),  # Loopback
+        ipaddress.ip_network("172.16.0.0/12"),  # Docker/container bridges
+        ipaddress.ip_network("169.254.0.0/16"),  # Link-local
+        ipaddress.ip_network("10.0.0.0/16"),  # Podman default
+    )
+)
 
-def validate_ip(ip: str) -> bool:
-    """Validate IP address format."""
-    if not ip:
-        return False
 
-    # Reject loopback
-    if ip.startswith("127."):
-        return False
+def _parse_ipv4(ip: str) -> Optional[int]:
+    """Parse a strict dotted-quad IPv4 address to an int, or None if malformed."""
+    try:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big")
+    except (OSError, ValueError):
+        return None
 
-    # Reject Docker/container bridge IPs (172.16-31.x.x)
-    if ip.startswith("172."):
-        try:
-            second_octet = int(ip.split('.')[1])
-            if 16 <= second_octet <= 31:
-                return False
-        except (IndexError, ValueError):
-            return False
 
-    # Reject link-local
-    if ip.startswith("169.254."):
+@lru_cache(maxsize=4096)
+def validate_ip(ip: str) -> bool:
+    """Validate IP address format."""
+    if not ip:
         return False
 
-    # Reject podman default
-    if ip.startswith("10.0."):
+    addr = _parse_ipv4(ip)
+    if addr is None:
         return False
 
-    # Basic format check
-    parts = ip.split('.')
-    if len(parts) != 4:
-        return False
+    # Reject loopback, container bridges, link-local and podman default
+    return not any(lo <= addr <= hi for lo, hi in _REJECTED_RANGES)
 
-    try:
-        for part in parts:
-            num = int(part)
-            if num < 0 or num > 255:
-                return False
-    except ValueError:
-        return False
 
-    return True
+def validate_ip_batch(ips: List[str]) -> List[bool]:
+    """Validate many IP addresses at once; results are in input order."""
+    return [validate_ip(ip) for ip in ips]
 
 
 # =============================================================================
@@ -481,6 +574,7 @@ __all__ = [
     "get_available_nodes",
     "get_all_node_aliases",
     "get_nodes_by_capability",
+    "get_node_ids_by_capability",
     "get_nodes_by_os",
     "resolve_node_id",
     "detect_local_node",
@@ -494,5 +588,7 @@ __all__ = [
     # Validation
     "validate_node_id",
     "validate_command",
+    "is_dangerous_command",
     "validate_ip",
+    "validate_ip_batch",
 ]
@@ -6,19 +6,32 @@ Routes tasks to optimal cluster nodes based on requirements, load, and capabilit
 Includes security-hardened SSH execution without shell injection vulnerabilities.
 """
 
+import asyncio
+import concurrent.futures
+import functools
 import json
 import os
+import queue
 import re
 import shlex
 import socket
 import sqlite3
 import subprocess
+import sys
 import tempfile
+import threading
 import time
 import uuid
-from dataclasses import dataclass, asdict, field
+from collections import OrderedDict, deque
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Any, Coroutine, Deque, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # Optional speedup; stdlib json is the fallback
+    orjson = None
 
 from .config import (
     config,
@@ -29,18 +42,81 @@ from .config import (
     get_node,
     get_available_nodes,
     get_db_path,
+    resolve_node_id,
     validate_node_id,
     validate_command,
     validate_ip,
     should_offload_command,
+    _normalize_os,
 )
 
 
+# The topology is static: snapshot it once for hashed membership tests and
+# ordered iteration (CLUSTER_NODES stays the source of truth)
+_CLUSTER_NODE_IDS = frozenset(CLUSTER_NODES)
+_CLUSTER_NODE_ITEMS = tuple(CLUSTER_NODES.items())
+
+
+def _json_dumps(obj: Any) -> str:
+    """Serialize task fields for storage, using orjson when available."""
+    if orjson is not None:
+        # OPT_NON_STR_KEYS stringifies int/float keys like json.dumps does
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj)
+
+
 # =============================================================================
 # IP Resolution Cache
 # =============================================================================
 
-_ip_cache: Dict[str, Tuple[str, float]] = {}  # hostname -> (ip, timestamp)
+_MISSING = object()
+
+
+class _TTLCache:
+    """
+    Bounded mapping whose entries expire ttl seconds after they are set.
+
+    Entries are kept in insertion order, so once maxsize is reached the oldest
+    one is evicted in O(1); expired entries are dropped when they are read.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return default
+        if time.time() >= item[1]:
+            # pop, not del: a concurrent probe may have evicted it already
+            self._data.pop(key, None)
+            return default
+        return item[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._data.pop(key, None)
+        self._data[key] = (value, time.time() + (self.ttl if ttl is None else ttl))
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.set(key, value)
+
+    def __contains__(self, key: object) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# hostname -> resolved IP, or None for a recent failure (kept for the shorter
+# ip_cache_negative_ttl)
+_ip_cache = _TTLCache(maxsize=1024, ttl=config.ip_cache_ttl)
 
 
 def clear_ip_cache() -> None:
@@ -89,28 +165,14 @@ def get_local_lan_ip() -> Optional[str]:
     return None
 
 
-def resolve_hostname(hostname: str) -> Optional[str]:
-    """
-    Resolve hostname to IP using multiple methods.
-
-    Supports mDNS (.local), DNS, and fallback methods.
-    Results are cached for performance.
-    """
-    now = time.time()
-
-    # Check cache first
-    if hostname in _ip_cache:
-        cached_ip, cached_time = _ip_cache[hostname]
-        if now - cached_time < config.ip_cache_ttl:
-            return cached_ip
-
+def _resolve_uncached(hostname: str) -> Optional[str]:
+    """Resolve hostname to IP, trying DNS, avahi, getent and ping in turn."""
     ip = None
 
     # Method 1: socket.gethostbyname (DNS and some mDNS)
     try:
         ip = socket.gethostbyname(hostname)
         if validate_ip(ip):
-            _ip_cache[hostname] = (ip, now)
             logger.debug(f"Resolved {hostname} to {ip} via DNS")
             return ip
     except socket.gaierror:
@@ -130,7 +192,6 @@ def resolve_hostname(hostname: str) -> Optional[str]:
                 if len(parts) >= 2:
                     ip = parts[1]
                     if validate_ip(ip):
-                        _ip_cache[hostname] = (ip, now)
                         logger.debug(f"Resolved {hostname} to {ip} via avahi")
                         return ip
         except subprocess.TimeoutExpired:
@@ -151,7 +212,6 @@ def resolve_hostname(hostname: str) -> Optional[str]:
         if result.returncode == 0 and result.stdout.strip():
             ip = result.stdout.strip().split()[0]
             if validate_ip(ip):
-                _ip_cache[hostname] = (ip, now)
                 logger.debug(f"Resolved {hostname} to {ip} via getent")
                 return ip
     except subprocess.TimeoutExpired:
@@ -174,7 +234,6 @@ def resolve_hostname(hostname: str) -> Optional[str]:
             if match:
                 ip = match.group(1)
                 if validate_ip(ip):
-                    _ip_cache[hostname] = (ip, now)
                     logger.debug(f"Resolved {hostname} to {ip} via ping")
                     return ip
     except subprocess.TimeoutExpired:
@@ -184,10 +243,61 @@ def resolve_hostname(hostname: str) -> Optional[str]:
     except OSError as e:
         logger.debug(f"OS error in ping resolution: {e}")
 
-    logger.warning(f"Failed to resolve hostname: {hostname}")
     return None
 
 
+def resolve_hostname(hostname: str) -> Optional[str]:
+    """
+    Resolve hostname to IP using multiple methods.
+
+    Supports mDNS (.local), DNS, and fallback methods.
+    Results are cached for performance.
+    """
+    # The cached IP, None for a cached failure, or _MISSING
+    cached = _ip_cache.get(hostname, _MISSING)
+    if cached is not _MISSING:
+        return cached
+
+    ip = _resolve_uncached(hostname)
+    if ip is None:
+        # A recent failure short-circuits the whole DNS/avahi/getent/ping chain
+        _ip_cache.set(hostname, None, ttl=config.ip_cache_negative_ttl)
+        logger.warning(f"Failed to resolve hostname: {hostname}")
+        return None
+
+    _ip_cache[hostname] = ip
+    return ip
+
+
+def _ssh_probe_argv(ip: str, timeout: int) -> List[str]:
+    """Build the argv for an `ssh ... exit` connectivity probe."""
+    # SECURITY: Using list arguments, not shell=True
+    return [
+        "ssh",
+        "-o", f"ConnectTimeout={timeout}",
+        "-o", "StrictHostKeyChecking=accept-new",
+        "-o", "BatchMode=yes",
+        f"{config.ssh_user}@{ip}",
+        "exit"
+    ]
+
+
+def _ssh_attempt(ip: str, timeout: int) -> bool:
+    """Run a single `ssh ... exit` probe."""
+    try:
+        result = subprocess.run(
+            _ssh_probe_argv(ip, timeout),
+            capture_output=True,
+            timeout=timeout + 2
+        )
+        return result.returncode == 0
+    except subprocess.TimeoutExpired:
+        logger.debug(f"SSH timeout for {ip}")
+    except OSError as e:
+        logger.debug(f"SSH error for {ip}: {e}")
+    return False
+
+
 def verify_ssh_connectivity(
     ip: str,
     timeout: Optional[int] = None,
@@ -198,40 +308,215 @@ def verify_ssh_connectivity(
 
     Uses actual SSH command execution because some IPs may have port 22 open
     but SSH commands timeout (e.g., WiFi interface vs Ethernet on same host).
+
+    With retries > 1 the attempts are hedged rather than serial: the next one
+    starts as soon as the previous fails, or once an attempt has gone a full
+    ConnectTimeout without answering, and the first success wins. A healthy
+    host therefore costs one ssh, and attempts still running when the check
+    returns are killed.
     """
     timeout = timeout or config.ssh_timeout
     retries = retries or config.ssh_retries
 
-    for attempt in range(retries):
-        try:
-            # SECURITY: Using list arguments, not shell=True
-            result = subprocess.run(
-                [
-                    "ssh",
-                    "-o", f"ConnectTimeout={timeout}",
-                    "-o", "StrictHostKeyChecking=accept-new",
-                    "-o", "BatchMode=yes",
-                    f"{config.ssh_user}@{ip}",
-                    "exit"
-                ],
-                capture_output=True,
-                timeout=timeout + 2
-            )
-            if result.returncode == 0:
-                logger.debug(f"SSH connectivity verified for {ip}")
-                return True
-        except subprocess.TimeoutExpired:
-            logger.debug(f"SSH timeout for {ip} (attempt {attempt + 1}/{retries})")
-        except OSError as e:
-            logger.debug(f"SSH error for {ip}: {e}")
+    if retries == 1:
+        ok = _ssh_attempt(ip, timeout)
+    else:
+        ok = _hedged_ssh_attempts(ip, timeout, retries)
 
-        if attempt < retries - 1:
-            time.sleep(0.5)
+    if ok:
+        logger.debug(f"SSH connectivity verified for {ip}")
+        return True
 
     logger.warning(f"SSH connectivity failed for {ip} after {retries} attempts")
     return False
 
 
+def _hedged_ssh_attempts(ip: str, timeout: int, retries: int) -> bool:
+    """Run up to `retries` overlapping probes; kill the losers before returning."""
+    procs: List[subprocess.Popen] = []
+    lock = threading.Lock()
+    finished = False
+
+    def attempt() -> bool:
+        with lock:
+            # Never spawn after the check has been decided
+            if finished:
+                return False
+            try:
+                proc = subprocess.Popen(
+                    _ssh_probe_argv(ip, timeout),
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL
+                )
+            except OSError as e:
+                logger.debug(f"SSH error for {ip}: {e}")
+                return False
+            procs.append(proc)
+        try:
+            return proc.wait(timeout=timeout + 2) == 0
+        except subprocess.TimeoutExpired:
+            logger.debug(f"SSH timeout for {ip}")
+            with suppress(ProcessLookupError):
+                proc.kill()
+            proc.wait()
+            return False
+
+    ok = False
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=retries)
+    try:
+        pending: set = set()
+        launched = 0
+        while not ok:
+            if launched < retries:
+                pending.add(pool.submit(attempt))
+                launched += 1
+            elif not pending:
+                break
+
+            done, pending = concurrent.futures.wait(
+                pending,
+                timeout=timeout if launched < retries else None,
+                return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            ok = any(f.result() for f in done)
+    finally:
+        with lock:
+            finished = True
+            for proc in procs:
+                if proc.poll() is None:
+                    with suppress(ProcessLookupError):
+                        proc.kill()
+        # Killed attempts return from wait() promptly, so this doesn't stall
+        pool.shutdown(wait=True)
+    return ok
+
+
+# SSH connection multiplexing: the first task to a host opens a master
+# connection that later ssh/scp invocations reuse for ControlPersist seconds,
+# skipping the TCP + key exchange handshake per task. %C is a fixed-length
+# hash of the connection, so long user/host names can't push the socket path
+# past the Unix socket length limit.
+_SSH_CONTROL_DIR = Path.home() / ".ssh"
+_SSH_MULTIPLEX_OPTS = [
+    "-o", "ControlMaster=auto",
+    "-o", f"ControlPath={_SSH_CONTROL_DIR}/cm-%C",
+    "-o", "ControlPersist=60s",
+]
+
+
+def _ensure_ssh_control_dir() -> None:
+    """Create the ControlPath directory; called only before remote execution."""
+    try:
+        _SSH_CONTROL_DIR.mkdir(mode=0o700, exist_ok=True)
+    except OSError as e:
+        logger.debug(f"Cannot create SSH control directory: {e}")
+
+
+def _ssh_argv(ip: str) -> List[str]:
+    """Build the multiplexed ssh argv prefix for a node; append the remote command."""
+    # SECURITY: list arguments, never passed through a local shell
+    return [
+        "ssh",
+        "-o", f"ConnectTimeout={config.ssh_connect_timeout}",
+        "-o", "StrictHostKeyChecking=accept-new",
+        "-o", "BatchMode=yes",
+        *_SSH_MULTIPLEX_OPTS,
+        f"{config.ssh_user}@{ip}",
+    ]
+
+
+# Output retained per stream of a task: at most _OUTPUT_MAX_BYTES, read in
+# _OUTPUT_CHUNK pieces and trimmed from the front, so a chatty command can't
+# exhaust memory
+_OUTPUT_CHUNK = 64 * 1024
+_OUTPUT_MAX_CHUNKS = 16
+_OUTPUT_MAX_BYTES = _OUTPUT_CHUNK * _OUTPUT_MAX_CHUNKS
+# Prepended to a stream whose head was dropped
+_OUTPUT_TRUNCATED_MARKER = b"[... earlier output truncated ...]\n"
+
+
+async def _drain(stream: asyncio.StreamReader) -> bytes:
+    """Read a pipe to EOF, keeping only its last _OUTPUT_MAX_BYTES."""
+    chunks: Deque[bytes] = deque()
+    buffered = 0
+    truncated = False
+    while True:
+        chunk = await stream.read(_OUTPUT_CHUNK)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        buffered += len(chunk)
+        # Bounded by bytes, not reads: many small writes are kept whole
+        while buffered > _OUTPUT_MAX_BYTES:
+            buffered -= len(chunks.popleft())
+            truncated = True
+    if truncated:
+        chunks.appendleft(_OUTPUT_TRUNCATED_MARKER)
+    return b"".join(chunks)
+
+
+async def _run_async(
+    args: Union[str, Sequence[str]],
+    timeout: float,
+    shell: bool = False,
+    text: bool = True
+) -> subprocess.CompletedProcess:
+    """
+    Run a subprocess on the event loop with subprocess.run-like semantics.
+
+    stdout and stderr are streamed through _drain rather than buffered whole,
+    so very long output keeps only its last ~1 MiB per stream.
+
+    Raises subprocess.TimeoutExpired (after killing the child) when it does not
+    finish within timeout, so callers keep the same error handling as before.
+    """
+    if shell:
+        proc = await asyncio.create_subprocess_shell(
+            args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+    else:
+        proc = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+
+    try:
+        stdout, stderr, _ = await asyncio.wait_for(
+            asyncio.gather(_drain(proc.stdout), _drain(proc.stderr), proc.wait()),
+            timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        with suppress(ProcessLookupError):
+            proc.kill()
+        await proc.wait()
+        raise subprocess.TimeoutExpired(args, timeout)
+
+    if text:
+        stdout = stdout.decode(errors="replace") if stdout else ""
+        stderr = stderr.decode(errors="replace") if stderr else ""
+    return subprocess.CompletedProcess(args, proc.returncode, stdout, stderr)
+
+
+def _run_sync(coro: Coroutine[Any, Any, Any]) -> Any:
+    """
+    Drive a coroutine to completion from synchronous code.
+
+    The MCP tools call the router from inside a running event loop, where
+    asyncio.run() is not allowed, so in that case the coroutine gets its own
+    loop on a short-lived worker thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
 def get_node_ip(
     node_id: str,
     is_local: bool = False,
@@ -283,7 +568,7 @@ def get_node_ip(
 # Task Definition
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class Task:
     """Task definition for cluster execution."""
     task_id: str
@@ -298,21 +583,97 @@ class Task:
     submitted_from: Optional[str] = None
     submitted_at: Optional[float] = None
 
+    def __post_init__(self):
+        # Low-cardinality labels shared by many tasks: keep one copy of each and
+        # let routing-key comparisons short-circuit on identity
+        # Rows read back with NULL columns can leave any of these as None
+        if self.task_type is not None:
+            self.task_type = sys.intern(self.task_type)
+        if self.requires_os is not None:
+            self.requires_os = sys.intern(self.requires_os)
+        if self.requires_arch is not None:
+            self.requires_arch = sys.intern(self.requires_arch)
+
     def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary."""
-        return asdict(self)
+        """Convert to dictionary.
+
+        Built directly rather than via dataclasses.asdict, which recurses and
+        deep-copies every field; only the mutable containers are copied.
+        """
+        d = {name: getattr(self, name) for name in self.__slots__}
+        if self.requires_capabilities is not None:
+            d["requires_capabilities"] = list(self.requires_capabilities)
+        if self.metadata is not None:
+            d["metadata"] = dict(self.metadata)
+        return d
 
 
 # =============================================================================
 # Distributed Task Router
 # =============================================================================
 
+# Applied to every connection: WAL lets status reads proceed while a task is
+# being written, and NORMAL sync avoids an fsync per insert (safe under WAL).
+# journal_size_limit truncates the -wal file after checkpoints so a bulk load
+# doesn't leave it large for the life of the server.
+_SQLITE_PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA journal_size_limit=6144000;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-20000;
+    PRAGMA busy_timeout=5000;
+    PRAGMA foreign_keys=ON;
+"""
+
+# Kept as a single constant so every call hits the per-connection statement
+# cache and reuses the prepared plan
+_GET_TASK_SQL = "SELECT * FROM task_queue WHERE task_id = ? LIMIT 1"
+
+# Secondary indices are built once the queue holds this many rows (or on the
+# first read), so bulk loads into a fresh queue skip B-tree maintenance.
+_INDEX_ROW_THRESHOLD = 1000
+_INDEX_NAMES = frozenset({"idx_status", "idx_assigned_to"})
+
+# Read-only connections cannot change the journal mode; they only need to
+# wait out writers and keep a warm page cache.
+_SQLITE_READER_PRAGMAS = """
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-20000;
+    PRAGMA busy_timeout=5000;
+"""
+
 class DistributedTaskRouter:
     """Routes tasks across cluster nodes automatically."""
 
     def __init__(self):
         self.local_node_id = self._detect_local_node()
-        self.db_path = get_db_path()
+        # Any path-like works: sqlite3.connect and the reader URI both accept
+        # str or os.PathLike, so tests may hand in plain strings
+        self.db_path: Union[str, "os.PathLike[str]"] = get_db_path()
+        # One serialized writer plus a pool of read-only connections
+        self._write_lock = threading.Lock()
+        self._write_conn = self._connect()
+        self._read_pool: "queue.Queue[sqlite3.Connection]" = queue.Queue(
+            maxsize=os.cpu_count() or 4
+        )
+        self._indices_ready = False
+        # Routing depends only on task requirements and the static topology,
+        # so decisions are memoized per router instance
+        self._route_task_cached = functools.lru_cache(maxsize=256)(self._route_uncached)
+        # One bit per known capability so node filtering is a single AND;
+        # unknown capabilities map to a bit no node has
+        all_caps = sorted({c.lower() for _, node in _CLUSTER_NODE_ITEMS for c in node.capabilities})
+        self._cap_bit = {cap: 1 << i for i, cap in enumerate(all_caps)}
+        self._unknown_cap_bit = 1 << len(all_caps)
+        self._node_bits = {
+            node_id: sum(self._cap_bit[c] for c in {c.lower() for c in node.capabilities})
+            for node_id, node in _CLUSTER_NODE_ITEMS
+        }
+        self._node_platform = {
+            node_id: (_normalize_os(node.os), node.arch.lower())
+            for node_id, node in _CLUSTER_NODE_ITEMS
+        }
         self._init_database()
         logger.info(f"Task router initialized on node: {self.local_node_id}")
 
@@ -322,7 +683,7 @@ class DistributedTaskRouter:
 
         # Try to detect node from hostname
         # Configure your hostname to match node IDs (e.g., builder, orchestrator, researcher, inference)
-        for node_id in CLUSTER_NODES.keys():
+        for node_id, _ in _CLUSTER_NODE_ITEMS:
             if node_id in hostname:
                 return node_id
 
@@ -331,62 +692,190 @@ class DistributedTaskRouter:
             local_ip = get_local_lan_ip()
             if local_ip:
                 # Match against known IPs
-                for node_id, node in CLUSTER_NODES.items():
+                for node_id, node in _CLUSTER_NODE_ITEMS:
                     if node.fallback_ip == local_ip:
                         return node_id
             return "orchestrator"  # Default macOS node
 
         return "builder"  # Default Linux node
 
+    def _connect(self) -> sqlite3.Connection:
+        """Open a tuned connection to the task queue database.
+
+        Autocommit mode (isolation_level=None) so writers can issue an
+        explicit BEGIN IMMEDIATE when they need a transaction.
+        """
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            isolation_level=None
+        )
+        conn.executescript(_SQLITE_PRAGMAS)
+        return conn
+
+    def _connect_reader(self) -> sqlite3.Connection:
+        """Open a read-only connection to the task queue database."""
+        uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.executescript(_SQLITE_READER_PRAGMAS)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _write_transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run statements on the writer connection inside BEGIN IMMEDIATE."""
+        with self._write_lock:
+            conn = self._write_conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    @contextmanager
+    def _reader(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a pooled read-only connection, opening one if none is idle."""
+        try:
+            conn = self._read_pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect_reader()
+        try:
+            yield conn
+        finally:
+            try:
+                self._read_pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close(self) -> None:
+        """Close the writer and all pooled reader connections."""
+        while True:
+            try:
+                self._read_pool.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._write_lock:
+            self._write_conn.close()
+
     def _init_database(self) -> None:
         """Initialize task queue database."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS task_queue (
-                    task_id TEXT PRIMARY KEY,
-                    task_type TEXT NOT NULL,
-                    command TEXT,
-                    script TEXT,
-                    requires_os TEXT,
-                    requires_arch TEXT,
-                    requires_capabilities TEXT,
-                    priority INTEGER DEFAULT 5,
-                    metadata TEXT,
-                    submitted_from TEXT,
-                    submitted_at REAL,
-                    assigned_to TEXT,
-                    assigned_at REAL,
-                    status TEXT DEFAULT 'pending',
-                    result TEXT,
-                    completed_at REAL,
-                    error TEXT
-                )
-            """)
-
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_status ON task_queue(status)
-            """)
+            # Existing queues need no schema work, so skip taking the write lock
+            if self._write_conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'task_queue'"
+            ).fetchone():
+                logger.debug(f"Database already initialized at {self.db_path}")
+                return
 
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_assigned_to ON task_queue(assigned_to)
-            """)
+            with self._write_transaction() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS task_queue (
+                        task_id TEXT PRIMARY KEY,
+                        task_type TEXT NOT NULL,
+                        command TEXT,
+                        script TEXT,
+                        requires_os TEXT,
+                        requires_arch TEXT,
+                        requires_capabilities TEXT,
+                        priority INTEGER DEFAULT 5,
+                        metadata TEXT,
+                        submitted_from TEXT,
+                        submitted_at REAL,
+                        assigned_to TEXT,
+                        assigned_at REAL,
+                        status TEXT DEFAULT 'pending',
+                        result TEXT,
+                        completed_at REAL,
+                        error TEXT
+                    )
+                """)
 
-            conn.commit()
-            conn.close()
             logger.debug(f"Database initialized at {self.db_path}")
         except sqlite3.Error as e:
             logger.error(f"Database initialization failed: {e}")
             raise
 
+    def _ensure_indices(self) -> None:
+        """Create secondary indices (once per router) and refresh planner stats."""
+        if self._indices_ready:
+            return
+
+        try:
+            # Another router already built them: skip the write lock and the
+            # ANALYZE, which rescans the whole table
+            with self._reader() as conn:
+                existing = {
+                    row[0] for row in conn.execute(
+                        "SELECT name FROM sqlite_master"
+                        " WHERE type = 'index' AND tbl_name = 'task_queue'"
+                    )
+                }
+            if _INDEX_NAMES <= existing:
+                self._indices_ready = True
+                return
+
+            with self._write_transaction() as conn:
+                conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_status ON task_queue(status)
+                """)
+                conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_assigned_to ON task_queue(assigned_to)
+                """)
+                conn.execute("ANALYZE task_queue")
+            self._indices_ready = True
+        except sqlite3.Error as e:
+            logger.error(f"Failed to create task queue indices: {e}")
+
     def submit_task(self, task_def: Dict[str, Any]) -> str:
         """
         Submit a task for execution.
 
         Task automatically routes to best available node based on requirements.
         """
+        task = self._build_task(task_def)
+
+        # Find best node for this task
+        target_node = self._route_task(task)
+        logger.info(f"Task {task.task_id} routed to {target_node}")
+
+        # Store in database
+        self._store_task(task, target_node)
+
+        # Execute on target node
+        if target_node == self.local_node_id:
+            self._execute_local(task)
+        else:
+            self._execute_remote(task, target_node)
+
+        return task.task_id
+
+    def execute_many(self, task_defs: List[Dict[str, Any]]) -> List[str]:
+        """
+        Submit a batch of tasks and run them concurrently.
+
+        All tasks are validated and routed up front, stored in one transaction,
+        then executed together on a single event loop. Returns the task IDs in
+        input order.
+        """
+        tasks = [self._build_task(task_def) for task_def in task_defs]
+        target_nodes = [self._route_task(task) for task in tasks]
+        self._store_tasks_bulk(tasks, target_nodes)
+
+        async def run_all() -> None:
+            await asyncio.gather(*(
+                self._execute_async(task, target_node)
+                for task, target_node in zip(tasks, target_nodes)
+            ))
+
+        _run_sync(run_all())
+        return [task.task_id for task in tasks]
+
+    def _build_task(self, task_def: Dict[str, Any]) -> Task:
+        """Validate a task definition and build a Task from it."""
         task_id = str(uuid.uuid4())
 
         # Validate command if present
@@ -396,7 +885,7 @@ class DistributedTaskRouter:
             if not valid:
                 raise ValueError(f"Invalid command: {error}")
 
-        task = Task(
+        return Task(
             task_id=task_id,
             task_type=task_def.get("type", "generic"),
             command=command,
@@ -410,57 +899,68 @@ class DistributedTaskRouter:
             submitted_at=time.time()
         )
 
-        # Find best node for this task
-        target_node = self._route_task(task)
-        logger.info(f"Task {task_id} routed to {target_node}")
-
-        # Store in database
-        self._store_task(task, target_node)
-
-        # Execute on target node
-        if target_node == self.local_node_id:
-            self._execute_local(task)
-        else:
-            self._execute_remote(task, target_node)
-
-        return task_id
-
     def _store_task(self, task: Task, target_node: str) -> None:
         """Store task in database."""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute("""
-                INSERT INTO task_queue (
-                    task_id, task_type, command, script,
-                    requires_os, requires_arch, requires_capabilities,
-                    priority, metadata, submitted_from, submitted_at,
-                    assigned_to, assigned_at, status
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
+        self._store_tasks_bulk([task], [target_node])
+
+    def _store_tasks_bulk(self, tasks: List[Task], target_nodes: List[str]) -> None:
+        """Store many tasks in a single transaction."""
+        assigned_at = time.time()
+        rows = [
+            (
                 task.task_id,
                 task.task_type,
                 task.command,
                 task.script,
                 task.requires_os,
                 task.requires_arch,
-                json.dumps(task.requires_capabilities) if task.requires_capabilities else None,
+                _json_dumps(task.requires_capabilities) if task.requires_capabilities else None,
                 task.priority,
-                json.dumps(task.metadata) if task.metadata else None,
+                _json_dumps(task.metadata) if task.metadata else None,
                 task.submitted_from,
                 task.submitted_at,
                 target_node,
-                time.time(),
+                assigned_at,
                 TaskStatus.ASSIGNED.value
-            ))
+            )
+            for task, target_node in zip(tasks, target_nodes)
+        ]
 
-            conn.commit()
-            conn.close()
+        try:
+            with self._write_transaction() as conn:
+                conn.executemany("""
+                    INSERT INTO task_queue (
+                        task_id, task_type, command, script,
+                        requires_os, requires_arch, requires_capabilities,
+                        priority, metadata, submitted_from, submitted_at,
+                        assigned_to, assigned_at, status
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+                # MAX(rowid) is a B-tree seek, unlike COUNT(*)
+                row_count = None
+                if not self._indices_ready:
+                    row_count = conn.execute("SELECT MAX(rowid) FROM task_queue").fetchone()[0]
         except sqlite3.Error as e:
-            logger.error(f"Failed to store task: {e}")
+            logger.error(f"Failed to store {len(rows)} task(s): {e}")
             raise
 
+        if row_count is not None and row_count >= _INDEX_ROW_THRESHOLD:
+            self._ensure_indices()
+
+    @staticmethod
+    def _route_key(task: Task) -> Tuple[str, Optional[str], Optional[str], Tuple[str, ...]]:
+        """Canonical tuple of the task fields that affect routing."""
+        return (
+            task.task_type,
+            task.requires_os,
+            task.requires_arch,
+            tuple(sorted(task.requires_capabilities or ()))
+        )
+
+    def clear_route_cache(self) -> None:
+        """Forget memoized routing decisions (call after topology changes)."""
+        self._route_task_cached.cache_clear()
+
     def _route_task(self, task: Task) -> str:
         """
         Determine best node for task execution.
@@ -473,22 +973,35 @@ class DistributedTaskRouter:
         5. Prefer less loaded nodes
         6. Avoid active node (aggressive offloading)
         """
+        return self._route_task_cached(self._route_key(task))
+
+    def _route_uncached(
+        self,
+        key: Tuple[str, Optional[str], Optional[str], Tuple[str, ...]]
+    ) -> str:
+        """Score every node for a routing key and return the best match."""
+        task_type, requires_os, requires_arch, requires_capabilities = key
         candidates: List[Tuple[str, int]] = []
 
-        for node_id, node in CLUSTER_NODES.items():
+        required_mask = 0
+        for cap in requires_capabilities:
+            required_mask |= self._cap_bit.get(cap.lower(), self._unknown_cap_bit)
+        want_os = _normalize_os(requires_os) if requires_os else None
+        want_arch = requires_arch.lower() if requires_arch else None
+
+        for node_id, node in _CLUSTER_NODE_ITEMS:
             # Check if node matches requirements
-            if not node.matches_requirements(
-                task.requires_os,
-                task.requires_arch,
-                task.requires_capabilities
-            ):
+            if (self._node_bits[node_id] & required_mask) != required_mask:
+                continue
+            node_os, node_arch = self._node_platform[node_id]
+            if (want_os and node_os != want_os) or (want_arch and node_arch != want_arch):
                 continue
 
             # Calculate match score
             score = 0
 
             # Prefer specialized nodes
-            if task.task_type in node.specialties:
+            if task_type in node.specialties:
                 score += 100
 
             # Prefer higher priority (lower number = higher priority)
@@ -508,28 +1021,34 @@ class DistributedTaskRouter:
         candidates.sort(key=lambda x: x[1], reverse=True)
         return candidates[0][0]
 
+    def _execute_async(self, task: Task, target_node: str) -> Coroutine[Any, Any, None]:
+        """Return the execution coroutine for a task on its target node."""
+        if target_node == self.local_node_id:
+            return self._execute_local_async(task)
+        return self._execute_remote_async(task, target_node)
+
     def _execute_local(self, task: Task) -> None:
         """Execute task on local node."""
+        _run_sync(self._execute_local_async(task))
+
+    async def _execute_local_async(self, task: Task) -> None:
+        """Execute task on local node without blocking a thread per subprocess."""
         try:
             if task.command:
                 # SECURITY: Parse command into list to avoid shell injection
                 # For complex shell commands, we still use shell=True but validate first
                 if any(c in task.command for c in ['|', '&&', '||', ';', '`', '$(']):
                     # Complex command with shell operators - validate and use shell
-                    result = subprocess.run(
+                    result = await _run_async(
                         task.command,
                         shell=True,
-                        capture_output=True,
-                        text=True,
                         timeout=config.command_timeout
                     )
                 else:
                     # Simple command - parse and execute without shell
                     cmd_parts = shlex.split(task.command)
-                    result = subprocess.run(
+                    result = await _run_async(
                         cmd_parts,
-                        capture_output=True,
-                        text=True,
                         timeout=config.command_timeout
                     )
                 output = result.stdout
@@ -547,10 +1066,8 @@ class DistributedTaskRouter:
 
                 try:
                     os.chmod(script_path, 0o755)
-                    result = subprocess.run(
+                    result = await _run_async(
                         [script_path],
-                        capture_output=True,
-                        text=True,
                         timeout=config.command_timeout
                     )
                     output = result.stdout
@@ -561,7 +1078,8 @@ class DistributedTaskRouter:
                 output = "No command or script provided"
                 error = None
 
-            self._update_task_result(
+            await asyncio.to_thread(
+                self._update_task_result,
                 task.task_id,
                 TaskStatus.COMPLETED,
                 output,
@@ -570,7 +1088,8 @@ class DistributedTaskRouter:
 
         except subprocess.TimeoutExpired:
             logger.error(f"Task {task.task_id} timed out")
-            self._update_task_result(
+            await asyncio.to_thread(
+                self._update_task_result,
                 task.task_id,
                 TaskStatus.TIMEOUT,
                 None,
@@ -578,16 +1097,23 @@ class DistributedTaskRouter:
             )
         except subprocess.SubprocessError as e:
             logger.error(f"Task {task.task_id} subprocess error: {e}")
-            self._update_task_result(task.task_id, TaskStatus.FAILED, None, str(e))
+            await asyncio.to_thread(self._update_task_result, task.task_id, TaskStatus.FAILED, None, str(e))
         except OSError as e:
             logger.error(f"Task {task.task_id} OS error: {e}")
-            self._update_task_result(task.task_id, TaskStatus.FAILED, None, str(e))
+            await asyncio.to_thread(self._update_task_result, task.task_id, TaskStatus.FAILED, None, str(e))
 
     def _execute_remote(self, task: Task, target_node: str) -> None:
         """Execute task on remote node via SSH."""
-        node = get_node(target_node)
-        if not node:
-            self._update_task_result(
+        _run_sync(self._execute_remote_async(task, target_node))
+
+    async def _execute_remote_async(self, task: Task, target_node: str) -> None:
+        """Execute task on remote node via SSH without blocking a thread."""
+        # Canonical IDs hit the set directly; role aliases (builder) fold first
+        if target_node not in _CLUSTER_NODE_IDS:
+            target_node = resolve_node_id(target_node)
+        if target_node not in _CLUSTER_NODE_IDS:
+            await asyncio.to_thread(
+                self._update_task_result,
                 task.task_id,
                 TaskStatus.FAILED,
                 None,
@@ -596,9 +1122,10 @@ class DistributedTaskRouter:
             return
 
         # Dynamically resolve IP
-        node_ip = get_node_ip(target_node)
+        node_ip = await asyncio.to_thread(get_node_ip, target_node)
         if not node_ip:
-            self._update_task_result(
+            await asyncio.to_thread(
+                self._update_task_result,
                 task.task_id,
                 TaskStatus.FAILED,
                 None,
@@ -607,21 +1134,13 @@ class DistributedTaskRouter:
             return
 
         ssh_target = f"{config.ssh_user}@{node_ip}"
+        _ensure_ssh_control_dir()
 
         try:
             if task.command:
                 # SECURITY: Using list arguments for SSH command
-                result = subprocess.run(
-                    [
-                        "ssh",
-                        "-o", f"ConnectTimeout={config.ssh_connect_timeout}",
-                        "-o", "StrictHostKeyChecking=accept-new",
-                        "-o", "BatchMode=yes",
-                        ssh_target,
-                        task.command
-                    ],
-                    capture_output=True,
-                    text=True,
+                result = await _run_async(
+                    [*_ssh_argv(node_ip), task.command],
                     timeout=config.command_timeout
                 )
                 output = result.stdout
@@ -641,34 +1160,29 @@ class DistributedTaskRouter:
 
                 try:
                     # SCP script to remote node - SECURITY: list arguments
-                    scp_result = subprocess.run(
+                    scp_result = await _run_async(
                         [
                             "scp",
                             "-o", f"ConnectTimeout={config.ssh_connect_timeout}",
                             "-o", "StrictHostKeyChecking=accept-new",
                             "-o", "BatchMode=yes",
+                            *_SSH_MULTIPLEX_OPTS,
                             local_script,
                             f"{ssh_target}:{remote_script}"
                         ],
-                        capture_output=True,
-                        timeout=60
+                        timeout=60,
+                        text=False
                     )
 
                     if scp_result.returncode != 0:
                         raise OSError(f"SCP failed: {scp_result.stderr.decode()}")
 
                     # Execute remote script - SECURITY: list arguments
-                    result = subprocess.run(
+                    result = await _run_async(
                         [
-                            "ssh",
-                            "-o", f"ConnectTimeout={config.ssh_connect_timeout}",
-                            "-o", "StrictHostKeyChecking=accept-new",
-                            "-o", "BatchMode=yes",
-                            ssh_target,
+                            *_ssh_argv(node_ip),
                             f"chmod +x {remote_script} && {remote_script} && rm {remote_script}"
                         ],
-                        capture_output=True,
-                        text=True,
                         timeout=config.command_timeout
                     )
                     output = result.stdout
@@ -677,7 +1191,8 @@ class DistributedTaskRouter:
                 finally:
                     os.unlink(local_script)
             else:
-                self._update_task_result(
+                await asyncio.to_thread(
+                    self._update_task_result,
                     task.task_id,
                     TaskStatus.FAILED,
                     None,
@@ -685,7 +1200,8 @@ class DistributedTaskRouter:
                 )
                 return
 
-            self._update_task_result(
+            await asyncio.to_thread(
+                self._update_task_result,
                 task.task_id,
                 TaskStatus.COMPLETED,
                 output,
@@ -694,7 +1210,8 @@ class DistributedTaskRouter:
 
         except subprocess.TimeoutExpired:
             logger.error(f"Remote task {task.task_id} timed out")
-            self._update_task_result(
+            await asyncio.to_thread(
+                self._update_task_result,
                 task.task_id,
                 TaskStatus.TIMEOUT,
                 None,
@@ -702,10 +1219,10 @@ class DistributedTaskRouter:
             )
         except subprocess.SubprocessError as e:
             logger.error(f"Remote task {task.task_id} error: {e}")
-            self._update_task_result(task.task_id, TaskStatus.FAILED, None, str(e))
+            await asyncio.to_thread(self._update_task_result, task.task_id, TaskStatus.FAILED, None, str(e))
         except OSError as e:
             logger.error(f"Remote task {task.task_id} OS error: {e}")
-            self._update_task_result(task.task_id, TaskStatus.FAILED, None, str(e))
+            await asyncio.to_thread(self._update_task_result, task.task_id, TaskStatus.FAILED, None, str(e))
 
     def _update_task_result(
         self,
@@ -716,33 +1233,22 @@ class DistributedTaskRouter:
     ) -> None:
         """Update task result in database."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE task_queue
-                SET status = ?, result = ?, error = ?, completed_at = ?
-                WHERE task_id = ?
-            """, (status.value, result, error, time.time(), task_id))
-            conn.commit()
-            conn.close()
+            with self._write_transaction() as conn:
+                conn.execute("""
+                    UPDATE task_queue
+                    SET status = ?, result = ?, error = ?, completed_at = ?
+                    WHERE task_id = ?
+                """, (status.value, result, error, time.time(), task_id))
         except sqlite3.Error as e:
             logger.error(f"Failed to update task result: {e}")
 
     def get_task_status(self, task_id: str) -> Optional[Dict[str, Any]]:
         """Get status of a task."""
+        self._ensure_indices()
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM task_queue WHERE task_id = ?", (task_id,))
-            row = cursor.fetchone()
-
-            if not row:
-                conn.close()
-                return None
-
-            columns = [desc[0] for desc in cursor.description]
-            conn.close()
-            return dict(zip(columns, row))
+            with self._reader() as conn:
+                row = conn.execute(_GET_TASK_SQL, (task_id,)).fetchone()
+            return dict(row) if row else None
         except sqlite3.Error as e:
             logger.error(f"Failed to get task status: {e}")
             return None
@@ -775,26 +1281,22 @@ class DistributedTaskRouter:
 
     def get_cluster_status(self) -> Dict[str, Any]:
         """Get status of all cluster nodes."""
+        self._ensure_indices()
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute("""
-                SELECT assigned_to, status, COUNT(*) as count
-                FROM task_queue
-                GROUP BY assigned_to, status
-            """)
+            with self._reader() as conn:
+                rows = conn.execute("""
+                    SELECT assigned_to, status, COUNT(*) as count
+                    FROM task_queue
+                    GROUP BY assigned_to, status
+                """).fetchall()
 
             node_stats: Dict[str, Dict[str, Any]] = {}
-            for row in cursor.fetchall():
-                node_id, status, count = row
+            for node_id, status, count in rows:
                 if node_id not in node_stats:
                     node_stats[node_id] = {"total": 0, "by_status": {}}
                 node_stats[node_id]["total"] += count
                 node_stats[node_id]["by_status"][status] = count
 
-            conn.close()
-
             return {
                 "local_node": self.local_node_id,
                 "cluster_nodes": {
@@ -802,9 +1304,9 @@ class DistributedTaskRouter:
                         "hostname": node.hostname,
                         "os": node.os,
                         "arch": node.arch,
-                        "capabilities": node.capabilities
+                        "capabilities": list(node.capabilities)
                     }
-                    for node_id, node in CLUSTER_NODES.items()
+                    for node_id, node in _CLUSTER_NODE_ITEMS
                 },
                 "task_distribution": node_stats
             }
@@ -16,6 +16,7 @@ Tools:
 """
 
 import asyncio
+import concurrent.futures
 import json
 import shlex
 import subprocess
@@ -57,6 +58,7 @@ class ClusterExecutionServer:
 
     def __init__(self):
         self._router: Optional[DistributedTaskRouter] = None
+        self._probe_pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
 
     @property
     def router(self) -> DistributedTaskRouter:
@@ -65,6 +67,26 @@ class ClusterExecutionServer:
             self._router = DistributedTaskRouter()
         return self._router
 
+    @property
+    def probe_pool(self) -> concurrent.futures.ThreadPoolExecutor:
+        """Lazy thread pool for probing remote nodes in parallel."""
+        if self._probe_pool is None:
+            self._probe_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max(len(CLUSTER_NODES), 1),
+                thread_name_prefix="cluster-probe"
+            )
+        return self._probe_pool
+
+    def close(self) -> None:
+        """Close the router's connections and stop the probe pool, if created."""
+        if self._router is not None:
+            self._router.close()
+            self._router = None
+        if self._probe_pool is not None:
+            # In-flight probes are bounded by the SSH timeouts; don't wait on them
+            self._probe_pool.shutdown(wait=False, cancel_futures=True)
+            self._probe_pool = None
+
     @property
     def local_node_id(self) -> str:
         """Get local node ID."""
@@ -120,94 +142,99 @@ class ClusterExecutionServer:
                 "reachable": True
             }
 
-        # Get remote metrics via SSH
-        for node_id, node in CLUSTER_NODES.items():
-            if node_id == self.local_node_id:
-                continue
+        # Get remote metrics via SSH, probing all nodes concurrently
+        futures = [
+            (node_id, self.probe_pool.submit(self._probe_node, node_id))
+            for node_id in CLUSTER_NODES
+            if node_id != self.local_node_id
+        ]
+        for node_id, future in futures:
+            status["nodes"][node_id] = future.result()
 
-            node_ip = get_node_ip(node_id)
-            if not node_ip:
-                status["nodes"][node_id] = {"reachable": False, "error": "Cannot resolve IP"}
-                continue
+        return status
 
-            try:
-                # SECURITY: Using list arguments with proper shell quoting
-                # The remote command must be a single argument to SSH with proper escaping
-                # so the remote shell doesn't interpret semicolons as command separators
-                metrics_script = (
-                    "import psutil, os; "
-                    "print(psutil.cpu_percent()); "
-                    "print(psutil.virtual_memory().percent); "
-                    "print(os.getloadavg()[0])"
-                )
-                # Quote the script for safe shell transport
-                remote_cmd = f"python3 -c {shlex.quote(metrics_script)}"
+    def _probe_node(self, node_id: str) -> Dict[str, Any]:
+        """Fetch CPU/memory/load metrics for a remote node over SSH."""
+        node_ip = get_node_ip(node_id)
+        if not node_ip:
+            return {"reachable": False, "error": "Cannot resolve IP"}
 
-                result = subprocess.run(
-                    [
-                        "ssh",
-                        "-o", f"ConnectTimeout={config.status_timeout}",
-                        "-o", "StrictHostKeyChecking=accept-new",
-                        "-o", "BatchMode=yes",
-                        f"{config.ssh_user}@{node_ip}",
-                        remote_cmd
-                    ],
-                    capture_output=True,
-                    text=True,
-                    timeout=config.status_timeout + 2
-                )
+        try:
+            # SECURITY: Using list arguments with proper shell quoting
+            # The remote command must be a single argument to SSH with proper escaping
+            # so the remote shell doesn't interpret semicolons as command separators
+            metrics_script = (
+                "import psutil, os; "
+                "print(psutil.cpu_percent()); "
+                "print(psutil.virtual_memory().percent); "
+                "print(os.getloadavg()[0])"
+            )
+            # Quote the script for safe shell transport
+            remote_cmd = f"python3 -c {shlex.quote(metrics_script)}"
+
+            result = subprocess.run(
+                [
+                    "ssh",
+                    "-o", f"ConnectTimeout={config.status_timeout}",
+                    "-o", "StrictHostKeyChecking=accept-new",
+                    "-o", "BatchMode=yes",
+                    f"{config.ssh_user}@{node_ip}",
+                    remote_cmd
+                ],
+                capture_output=True,
+                text=True,
+                timeout=config.status_timeout + 2
+            )
 
-                if result.returncode == 0:
-                    # Get last line to skip shell startup messages (e.g., "Cluster environment loaded...")
-                    lines = result.stdout.strip().split('\n')
-                    last_line = lines[-1] if lines else ""
-                    parts = last_line.split()
-
-                    if len(parts) >= 3:
-                        try:
-                            cpu = float(parts[0])
-                            memory = float(parts[1])
-                            load = float(parts[2])
-
-                            is_overloaded = (
-                                cpu > config.cpu_threshold or
-                                memory > config.memory_threshold or
-                                load > config.load_threshold
-                            )
-
-                            status["nodes"][node_id] = {
-                                "cpu_percent": round(cpu, 1),
-                                "memory_percent": round(memory, 1),
-                                "load_1m": round(load, 2),
-                                "status": "overloaded" if is_overloaded else "healthy",
-                                "reachable": True
-                            }
-                        except ValueError as e:
-                            status["nodes"][node_id] = {
-                                "reachable": True,
-                                "error": f"Parse error: {e}, output: {last_line[:100]}"
-                            }
-                    else:
-                        status["nodes"][node_id] = {
+            if result.returncode == 0:
+                # Get last line to skip shell startup messages (e.g., "Cluster environment loaded...")
+                lines = result.stdout.strip().split('\n')
+                last_line = lines[-1] if lines else ""
+                parts = last_line.split()
+
+                if len(parts) >= 3:
+                    try:
+                        cpu = float(parts[0])
+                        memory = float(parts[1])
+                        load = float(parts[2])
+
+                        is_overloaded = (
+                            cpu > config.cpu_threshold or
+                            memory > config.memory_threshold or
+                            load > config.load_threshold
+                        )
+
+                        return {
+                            "cpu_percent": round(cpu, 1),
+                            "memory_percent": round(memory, 1),
+                            "load_1m": round(load, 2),
+                            "status": "overloaded" if is_overloaded else "healthy",
+                            "reachable": True
+                        }
+                    except ValueError as e:
+                        return {
                             "reachable": True,
-                            "error": f"Unexpected output format: {last_line[:100]}"
+                            "error": f"Parse error: {e}, output: {last_line[:100]}"
                         }
                 else:
-                    status["nodes"][node_id] = {
-                        "reachable": False,
-                        "error": result.stderr[:200] if result.stderr else "SSH failed"
+                    return {
+                        "reachable": True,
+                        "error": f"Unexpected output format: {last_line[:100]}"
                     }
+            else:
+                return {
+                    "reachable": False,
+                    "error": result.stderr[:200] if result.stderr else "SSH failed"
+                }
 
-            except subprocess.TimeoutExpired:
-                status["nodes"][node_id] = {"reachable": False, "error": "Timeout"}
-            except subprocess.SubprocessError as e:
-                status["nodes"][node_id] = {"reachable": False, "error": str(e)}
-            except ValueError as e:
-                status["nodes"][node_id] = {"reachable": True, "error": f"Parse error: {e}"}
-            except OSError as e:
-                status["nodes"][node_id] = {"reachable": False, "error": str(e)}
-
-        return status
+        except subprocess.TimeoutExpired:
+            return {"reachable": False, "error": "Timeout"}
+        except subprocess.SubprocessError as e:
+            return {"reachable": False, "error": str(e)}
+        except ValueError as e:
+            return {"reachable": True, "error": f"Parse error: {e}"}
+        except OSError as e:
+            return {"reachable": False, "error": str(e)}
 
     def execute_local(self, command: str) -> Dict[str, Any]:
         """Execute command locally."""
@@ -591,7 +618,11 @@ async def parallel_execute(commands: List[str]) -> str:
 def main():
     """Run the MCP server."""
     logger.info("Starting Cluster Execution MCP Server")
-    mcp.run()
+    try:
+        mcp.run()
+    finally:
+        if _server is not None:
+            _server.close()
 
 
 if __name__ == "__main__":
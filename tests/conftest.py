@@ -1,10 +1,14 @@
 """Pytest configuration and fixtures for cluster-execution-mcp tests."""
 
 import os
+import re
+import shutil
+import subprocess
 import pytest
 import tempfile
 from pathlib import Path
-from unittest.mock import patch, MagicMock
+from types import SimpleNamespace
+from unittest.mock import patch
 
 # Set test environment variables before importing modules
 os.environ.setdefault("CLUSTER_SSH_USER", "testuser")
@@ -12,35 +16,211 @@ os.environ.setdefault("CLUSTER_SSH_TIMEOUT", "2")
 os.environ.setdefault("CLUSTER_CMD_TIMEOUT", "10")
 
 
+try:
+    import pytest_benchmark  # noqa: F401
+except ImportError:
+    @pytest.fixture
+    def benchmark():
+        """Stand-in so benchmark gates skip cleanly without pytest-benchmark."""
+        pytest.skip("pytest-benchmark not installed")
+
+
+@pytest.fixture(scope="session")
+def cluster_nodes():
+    """Cluster node definitions, bound once per session."""
+    from cluster_execution_mcp.config import CLUSTER_NODES
+    return CLUSTER_NODES
+
+
+@pytest.fixture
+def env_override():
+    """Set environment variables, restoring only the keys that were touched."""
+    saved = {}
+
+    def _set(key, value):
+        saved.setdefault(key, os.environ.get(key))
+        os.environ[key] = value
+
+    try:
+        yield _set
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+@pytest.fixture
+def fast_subprocess(request, monkeypatch):
+    """
+    Replace subprocess.run with a cheap dispatcher so the test spawns no real tools.
+
+    Every call succeeds with empty output unless the test registers a canned
+    (returncode, stdout, stderr) keyed by program name plus any other argv
+    items that must be present:
+
+        fast_subprocess[("ssh", "192.168.1.10")] = (0, "builder-host", "")
+    """
+    responses = {}
+    request.node.subprocess_responses = responses
+
+    def _dispatch(args, *_, **__):
+        argv = [args] if isinstance(args, str) else list(args)
+        for key, (returncode, stdout, stderr) in responses.items():
+            if key[0] == argv[0] and all(item in argv for item in key[1:]):
+                return subprocess.CompletedProcess(
+                    args=argv, returncode=returncode, stdout=stdout, stderr=stderr
+                )
+        return subprocess.CompletedProcess(args=argv, returncode=0, stdout="", stderr="")
+
+    monkeypatch.setattr("subprocess.run", _dispatch)
+    return responses
+
+
 @pytest.fixture
 def mock_subprocess():
     """Mock subprocess.run for testing without actual SSH calls."""
-    with patch("subprocess.run") as mock_run:
-        mock_result = MagicMock()
-        mock_result.returncode = 0
-        mock_result.stdout = "test output"
-        mock_result.stderr = ""
-        mock_run.return_value = mock_result
+    with patch("subprocess.run", autospec=True) as mock_run:
+        mock_run.return_value = subprocess.CompletedProcess(
+            args=[], returncode=0, stdout="test output", stderr=""
+        )
         yield mock_run
 
 
+# (cpu_percent, load_1m, memory_percent) well under every offload threshold
+_LIGHT_LOAD = (25.0, 1.5, 50.0)
+
+
 @pytest.fixture
-def mock_psutil():
+def psutil_load(request, monkeypatch):
+    """
+    Pin psutil readings to a (cpu_percent, load_1m, memory_percent) scenario.
+
+    Defaults to a lightly loaded node; parametrize indirectly to vary it:
+
+        @pytest.mark.parametrize("psutil_load", [(95.0, 1.0, 50.0)], indirect=True)
+    """
+    import psutil
+
+    cpu, load, mem = getattr(request, "param", _LIGHT_LOAD)
+    loadavg = (load, 1.0, 0.5)
+    memory = SimpleNamespace(percent=mem)
+    monkeypatch.setattr(psutil, "cpu_percent", lambda interval=None: cpu)
+    monkeypatch.setattr(psutil, "getloadavg", lambda: loadavg)
+    monkeypatch.setattr(psutil, "virtual_memory", lambda: memory)
+    return cpu, load, mem
+
+
+@pytest.fixture
+def mock_psutil(psutil_load):
     """Mock psutil for testing without actual system metrics."""
-    with patch("psutil.cpu_percent", return_value=25.0), \
-         patch("psutil.virtual_memory") as mock_mem, \
-         patch("psutil.getloadavg", return_value=(1.5, 1.0, 0.5)):
-        mock_mem.return_value = MagicMock(percent=50.0)
-        yield
+    return psutil_load
+
+
+@pytest.fixture(scope="session")
+def db_root(tmp_path_factory):
+    """
+    One directory holding every test's database file for the session.
+
+    Placed on tmpfs (/dev/shm) when available so SQLite writes and journal
+    syncs never touch disk; falls back to pytest's temp directory. Under
+    pytest-xdist each worker runs its own session, so the directory (and the
+    template and session databases in it) is per worker and named after it;
+    workers never contend for the same SQLite file.
+    """
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    shm = Path("/dev/shm")
+    if shm.is_dir() and os.access(shm, os.W_OK):
+        root = Path(tempfile.mkdtemp(prefix=f"cluster-mcp-tests-{worker}-", dir=shm))
+        yield root
+        shutil.rmtree(root, ignore_errors=True)
+    else:
+        yield tmp_path_factory.mktemp(f"task_queues-{worker}")
+
+
+@pytest.fixture(scope="session")
+def db_template(db_root):
+    """Task queue database with the schema already created, built once per session."""
+    from cluster_execution_mcp.router import DistributedTaskRouter
+
+    template = db_root / "template.db"
+    with patch("cluster_execution_mcp.router.get_db_path", return_value=template):
+        DistributedTaskRouter().close()
+    return template
+
+
+@pytest.fixture(scope="session")
+def session_db_path(db_template, db_root):
+    """Task queue database shared by every test that doesn't ask for its own."""
+    db_path = os.path.join(db_root, "session.db")
+    shutil.copyfile(db_template, db_path)
+    return db_path
+
+
+@pytest.fixture(autouse=True)
+def _patch_db(monkeypatch, session_db_path):
+    """Point every router at the session database instead of the real queue."""
+    monkeypatch.setattr("cluster_execution_mcp.router.get_db_path", lambda: session_db_path)
+
+
+@pytest.fixture
+def temp_db(session_db_path):
+    """Database path for tests that touch the queue but don't inspect it."""
+    return session_db_path
+
+
+@pytest.fixture
+def mock_db_path(db_template, db_root, request, monkeypatch, _patch_db):
+    """Per-test copy of the template database, named after the test node."""
+    db_path = os.path.join(db_root, re.sub(r"\W", "_", request.node.nodeid) + ".db")
+    shutil.copyfile(db_template, db_path)
+    monkeypatch.setattr("cluster_execution_mcp.router.get_db_path", lambda: db_path)
+    return db_path
+
+
+@pytest.fixture(scope="class")
+def server():
+    """
+    One ClusterExecutionServer per test class, for tests that only read state.
+
+    The router is still built lazily on first use, under that test's database
+    redirect. Tests that swap in a mock router must build their own instance.
+    """
+    from cluster_execution_mcp.server import ClusterExecutionServer
+
+    server = ClusterExecutionServer()
+    yield server
+    server.close()
 
 
 @pytest.fixture
-def temp_db():
-    """Create temporary database for testing."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        db_path = Path(tmpdir) / "test_task_queue.db"
-        with patch("cluster_execution_mcp.config.get_db_path", return_value=db_path):
-            yield db_path
+def make_router():
+    """Factory for DistributedTaskRouter instances; every one is closed at teardown."""
+    from cluster_execution_mcp.router import DistributedTaskRouter
+
+    routers = []
+
+    def _make():
+        routers.append(DistributedTaskRouter())
+        return routers[-1]
+
+    yield _make
+    for router in routers:
+        router.close()
+
+
+@pytest.fixture
+def make_task():
+    """Factory for Task objects with shell-task defaults; override any field by keyword."""
+    from cluster_execution_mcp.router import Task
+
+    def _make(**overrides):
+        fields = {"task_id": "test-task", "task_type": "shell", "command": "echo test"}
+        fields.update(overrides)
+        return Task(**fields)
+
+    return _make
 
 
 @pytest.fixture
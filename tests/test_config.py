@@ -2,7 +2,6 @@
 
 import os
 import pytest
-from unittest.mock import patch
 
 
 class TestClusterConfig:
@@ -15,44 +14,49 @@ class TestClusterConfig:
         # Should use env var or default
         assert config.ssh_user in ["testuser", "marc"]
 
-    def test_default_timeouts(self):
-        """Test default timeout values."""
+    @pytest.mark.parametrize("attr,typ,lo,hi", [
+        ("ssh_timeout", int, 2, 3600),
+        ("ssh_connect_timeout", int, 2, 3600),
+        ("command_timeout", int, 10, 86400),
+        ("cpu_threshold", float, 1, 100),
+        ("load_threshold", float, 0.1, 1024),
+        ("memory_threshold", float, 1, 100),
+    ])
+    def test_default_values(self, attr, typ, lo, hi):
+        """Test default timeout and threshold values are typed and in range."""
         from cluster_execution_mcp.config import ClusterConfig
-        config = ClusterConfig()
-        assert config.ssh_timeout >= 2
-        assert config.ssh_connect_timeout >= 2
-        assert config.command_timeout >= 10
+        value = getattr(ClusterConfig(), attr)
+        assert isinstance(value, typ) and lo <= value <= hi
 
-    def test_default_thresholds(self):
-        """Test default threshold values."""
+    def test_config_from_environment(self, env_override):
+        """Test config values are read from environment variables."""
+        env_override("CLUSTER_SSH_TIMEOUT", "10")
+        env_override("CLUSTER_CPU_THRESHOLD", "50")
         from cluster_execution_mcp.config import ClusterConfig
         config = ClusterConfig()
-        assert 0 < config.cpu_threshold <= 100
-        assert config.load_threshold > 0
-        assert 0 < config.memory_threshold <= 100
+        assert config.ssh_timeout == 10
+        assert config.cpu_threshold == 50.0
 
 
 class TestClusterNodes:
     """Tests for cluster node definitions."""
 
-    def test_cluster_nodes_defined(self):
+    def test_cluster_nodes_defined(self, cluster_nodes):
         """Test that cluster nodes are properly defined."""
-        from cluster_execution_mcp.config import CLUSTER_NODES
-        assert len(CLUSTER_NODES) >= 3
-        assert "macpro51" in CLUSTER_NODES
-        assert "mac-studio" in CLUSTER_NODES
+        assert len(cluster_nodes) >= 3
+        assert "macpro51" in cluster_nodes
+        assert "mac-studio" in cluster_nodes
 
-    def test_node_has_required_fields(self):
+    def test_node_has_required_fields(self, cluster_nodes):
         """Test that nodes have all required fields."""
-        from cluster_execution_mcp.config import CLUSTER_NODES
-        for node_id, node in CLUSTER_NODES.items():
+        for node_id, node in cluster_nodes.items():
             assert node.node_id == node_id
             assert node.hostname
             assert node.fallback_ip
             assert node.os in ["linux", "macos"]
             assert node.arch in ["x86_64", "arm64"]
-            assert isinstance(node.capabilities, list)
-            assert isinstance(node.specialties, list)
+            assert isinstance(node.capabilities, tuple)
+            assert isinstance(node.specialties, tuple)
 
     def test_get_node_valid(self):
         """Test get_node with valid node ID."""
@@ -82,6 +86,13 @@ class TestClusterNodes:
         for node in docker_nodes:
             assert "docker" in [c.lower() for c in node.capabilities]
 
+    def test_get_node_ids_by_capability(self):
+        """Test capability lookup by node ID set."""
+        from cluster_execution_mcp.config import get_node_ids_by_capability
+        assert "macpro51" in get_node_ids_by_capability("docker")
+        assert "macpro51" in get_node_ids_by_capability("DOCKER")
+        assert get_node_ids_by_capability("nonexistent") == frozenset()
+
     def test_get_nodes_by_os(self):
         """Test filtering nodes by OS."""
         from cluster_execution_mcp.config import get_nodes_by_os
@@ -136,6 +147,18 @@ class TestNodeMatching:
         assert mac_node.matches_requirements(requires_os="macos")
 
 
+class TestTaskStatus:
+    """Tests for TaskStatus enum."""
+
+    def test_status_values(self):
+        """Test status values match the strings stored in the task queue."""
+        from cluster_execution_mcp.config import TaskStatus
+        assert tuple(s.value for s in TaskStatus) == (
+            "pending", "assigned", "running", "completed",
+            "failed", "cancelled", "timeout",
+        )
+
+
 class TestValidation:
     """Tests for validation functions."""
 
@@ -174,32 +197,141 @@ class TestValidation:
         assert valid is False
         assert "dangerous" in error.lower()
 
-    def test_validate_ip_valid(self):
-        """Test validation of valid IP."""
-        from cluster_execution_mcp.config import validate_ip
-        assert validate_ip("192.168.1.1") is True
-        assert validate_ip("10.10.10.10") is True
-
-    def test_validate_ip_invalid_format(self):
-        """Test validation of invalid IP format."""
-        from cluster_execution_mcp.config import validate_ip
-        assert validate_ip("not.an.ip") is False
-        assert validate_ip("256.1.1.1") is False
-
-    def test_validate_ip_rejects_loopback(self):
-        """Test validation rejects loopback addresses."""
-        from cluster_execution_mcp.config import validate_ip
-        assert validate_ip("127.0.0.1") is False
+    def test_validate_command_uses_precompiled_patterns(self):
+        """Test validation never compiles regexes on the hot path."""
+        from unittest.mock import patch
+        from cluster_execution_mcp.config import validate_command, _check_command
+
+        _check_command.cache_clear()
+        with patch("re.compile") as mock_compile:
+            assert validate_command("dd if=/dev/zero of=/dev/sda")[0] is False
+            assert validate_command("echo test")[0] is True
+        mock_compile.assert_not_called()
+
+    def test_validate_command_prefilter_skips_regex(self):
+        """Test benign commands bypass the regex scan via the keyword prefilter."""
+        from unittest.mock import patch
+        from cluster_execution_mcp.config import validate_command, _check_command
+
+        _check_command.cache_clear()
+        with patch("cluster_execution_mcp.config._DANGEROUS_RE") as mock_re:
+            mock_re.search.return_value = None
+            assert validate_command("echo test | wc -l") == (True, None)
+            mock_re.search.assert_not_called()
+
+            validate_command("RM -RF /tmp/x")
+            mock_re.search.assert_called_once()
+
+    @pytest.mark.parametrize("command", [
+        "rm -rf /",
+        "RM -RF /",
+        "echo hi > /dev/sda",
+        "dd if=/dev/zero of=/dev/sda",
+        ":(){ :|:& };:",
+    ])
+    def test_validate_command_prefilter_keeps_matches(self, command):
+        """Test every dangerous pattern still passes the keyword prefilter."""
+        from cluster_execution_mcp.config import validate_command
+        valid, error = validate_command(command)
+        assert valid is False
+        assert "dangerous" in error.lower()
 
-    def test_validate_ip_rejects_docker(self):
-        """Test validation rejects Docker bridge IPs."""
-        from cluster_execution_mcp.config import validate_ip
-        assert validate_ip("172.17.0.1") is False
+    @pytest.mark.parametrize("command, dangerous", [
+        ("rm -rf /", True),
+        (":(){ :|:& };:", True),
+        ("dd if=/dev/zero of=/dev/sda", True),
+        ("echo hi > /dev/sda", True),
+        ("rm -rf ./build", False),
+        ("ls /dev/null", False),
+        ("", False),
+    ])
+    def test_is_dangerous_command(self, command, dangerous):
+        """Test the pattern check in isolation from the other validation rules."""
+        from cluster_execution_mcp.config import is_dangerous_command
+        assert is_dangerous_command(command) is dangerous
+
+    @pytest.mark.parametrize("command", [
+        "sudo rm -rf /",
+        "cd /tmp && rm -rf /",
+        "ls; rm -rf /",
+        "echo ok | xargs rm -rf /",
+        "  dd if=/dev/zero of=/dev/sda",
+        "true; :(){ :|:& };:",
+    ])
+    def test_validate_command_detects_mid_command(self, command):
+        """Test dangerous patterns are caught anywhere, not only as a prefix."""
+        from cluster_execution_mcp.config import validate_command
+        valid, error = validate_command(command)
+        assert valid is False
+        assert "dangerous" in error.lower()
 
-    def test_validate_ip_rejects_link_local(self):
-        """Test validation rejects link-local addresses."""
+    def test_validators_are_memoized(self):
+        """Test repeated validation of the same input is served from cache."""
+        from cluster_execution_mcp.config import _check_command, validate_ip, validate_node_id
+
+        for validator, value in (
+            (_check_command, "make -j8 all"),
+            (validate_ip, "192.168.1.20"),
+            (validate_node_id, "macpro51"),
+        ):
+            validator.cache_clear()
+            first = validator(value)
+            assert validator(value) == first
+            assert validator.cache_info().hits == 1
+
+    def test_validate_command_length_limits(self):
+        """Test oversized commands are rejected and long ones bypass the cache."""
+        from cluster_execution_mcp.config import (
+            validate_command, _check_command, _CACHED_COMMAND_BYTES, _MAX_COMMAND_LENGTH
+        )
+
+        valid, error = validate_command("echo " + "a" * _MAX_COMMAND_LENGTH)
+        assert valid is False
+        assert "maximum length" in error
+
+        _check_command.cache_clear()
+        padding = "a" * _CACHED_COMMAND_BYTES
+        # Dangerous tail past the cache cutoff is still caught
+        assert validate_command(f"echo {padding}; rm -rf /")[0] is False
+        # Non-ASCII text is budgeted at 4 bytes per character
+        assert validate_command("echo " + "é" * (_CACHED_COMMAND_BYTES // 4))[0] is True
+        assert _check_command.cache_info().currsize == 0
+
+    def test_validate_node_id_after_topology_change(self):
+        """Test cache_clear() makes validate_node_id see a patched node set."""
+        from unittest.mock import patch
+        from cluster_execution_mcp.config import CLUSTER_NODES, validate_node_id
+
+        validate_node_id.cache_clear()
+        assert validate_node_id("gpu-box")[0] is False
+        with patch.dict(CLUSTER_NODES, {"gpu-box": CLUSTER_NODES["macpro51"]}):
+            validate_node_id.cache_clear()
+            assert validate_node_id("gpu-box") == (True, None)
+        validate_node_id.cache_clear()
+        valid, error = validate_node_id("gpu-box")
+        assert valid is False
+        assert "gpu-box" not in error.split("Available:")[1]
+
+    @pytest.mark.parametrize("ip,expected", [
+        ("192.168.1.1", True),
+        ("10.10.10.10", True),
+        ("not.an.ip", False),
+        ("256.1.1.1", False),
+        ("127.0.0.1", False),  # Loopback
+        ("172.17.0.1", False),  # Docker bridge
+        ("169.254.1.1", False),  # Link-local
+        ("172.15.255.255", True),  # Just below the Docker range
+        ("172.31.255.255", False),
+        ("10.0.255.255", False),  # Podman default
+        ("10.1.0.0", True),
+        ("192.168.1", False),  # Shorthand forms are not accepted
+        ("192.168.01.1", False),
+        ("0x7f.0.0.1", False),
+    ])
+    def test_validate_ip(self, ip, expected):
+        """Test IP validation accepts LAN IPs and rejects bad/internal ones."""
         from cluster_execution_mcp.config import validate_ip
-        assert validate_ip("169.254.1.1") is False
+        assert validate_ip(ip) is expected
 
 
 class TestOffloadPatterns:
@@ -1,8 +1,9 @@
 """Tests for cluster_execution_mcp.router module."""
 
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import subprocess
+import threading
 
 
 class TestIPResolution:
@@ -33,6 +34,20 @@ class TestIPResolution:
             # DNS should only be called once
             assert mock_dns.call_count == 1
 
+    def test_resolve_hostname_cache_expires(self, clear_ip_cache):
+        """Test cached IPs are re-resolved once the TTL window rolls over."""
+        from cluster_execution_mcp.router import resolve_hostname
+        from cluster_execution_mcp.config import config
+
+        with patch("socket.gethostbyname", return_value="192.168.1.100") as mock_dns:
+            with patch("time.time", return_value=0.0):
+                resolve_hostname("expiring.local")
+                resolve_hostname("expiring.local")
+            with patch("time.time", return_value=float(config.ip_cache_ttl)):
+                resolve_hostname("expiring.local")
+
+            assert mock_dns.call_count == 2
+
     def test_resolve_hostname_dns_failure_fallback(self, clear_ip_cache):
         """Test fallback methods when DNS fails."""
         from cluster_execution_mcp.router import resolve_hostname
@@ -40,21 +55,77 @@ class TestIPResolution:
 
         # Mock DNS failure
         with patch("socket.gethostbyname", side_effect=socket.gaierror):
-            with patch("subprocess.run") as mock_run:
-                mock_run.return_value = MagicMock(
-                    returncode=0,
+            with patch("subprocess.run", autospec=True) as mock_run:
+                mock_run.return_value = subprocess.CompletedProcess(
+                    args=[], returncode=0,
                     stdout="test.local\t192.168.1.200"
                 )
                 result = resolve_hostname("test.local")
                 # Should try avahi-resolve
                 assert mock_run.called
 
+    def test_resolve_hostname_caches_failure(self, clear_ip_cache):
+        """Test failed lookups are cached so fallbacks aren't re-run."""
+        from cluster_execution_mcp.router import resolve_hostname
+        import socket
+
+        with patch("socket.gethostbyname", side_effect=socket.gaierror):
+            with patch("subprocess.run", autospec=True) as mock_run:
+                mock_run.return_value = subprocess.CompletedProcess(args=[], returncode=1, stdout="")
+                assert resolve_hostname("missing.local") is None
+                calls_after_first = mock_run.call_count
+                assert resolve_hostname("missing.local") is None
+                assert mock_run.call_count == calls_after_first
+
+    def test_resolve_hostname_failure_expires(self, clear_ip_cache):
+        """Test cached failures are retried after the negative TTL."""
+        from cluster_execution_mcp.router import resolve_hostname
+        from cluster_execution_mcp.config import config
+        import socket
+
+        with patch("socket.gethostbyname", side_effect=socket.gaierror), \
+             patch("subprocess.run", autospec=True, return_value=subprocess.CompletedProcess(args=[], returncode=1, stdout="")):
+            with patch("time.time", return_value=0.0):
+                assert resolve_hostname("flaky.local") is None
+
+        with patch("socket.gethostbyname", return_value="192.168.1.50"), \
+             patch("time.time", return_value=float(config.ip_cache_negative_ttl)):
+            assert resolve_hostname("flaky.local") == "192.168.1.50"
+
+    def test_ip_cache_is_bounded(self):
+        """Test the TTL cache evicts its oldest entry once full."""
+        from cluster_execution_mcp.router import _TTLCache
+
+        cache = _TTLCache(maxsize=2, ttl=60)
+        cache["a"] = "192.168.1.1"
+        cache["b"] = "192.168.1.2"
+        cache["c"] = "192.168.1.3"
+
+        assert len(cache) == 2
+        assert "a" not in cache
+        assert cache.get("c") == "192.168.1.3"
+
+    def test_ttl_cache_expiry_tolerates_concurrent_eviction(self):
+        """Test an expired read doesn't raise if the entry vanished meanwhile."""
+        from cluster_execution_mcp.router import _TTLCache
+
+        class _VanishingDict(dict):
+            # Simulates another thread evicting the key between get() and removal
+            def get(self, key, default=None):
+                item = super().get(key, default)
+                self.pop(key, None)
+                return item
+
+        cache = _TTLCache(maxsize=4, ttl=60)
+        cache._data = _VanishingDict(host=("192.168.1.1", 0.0))
+        assert cache.get("host") is None
+
     def test_clear_ip_cache(self, clear_ip_cache):
         """Test clearing IP cache."""
         from cluster_execution_mcp.router import _ip_cache, clear_ip_cache as do_clear
 
         # Add to cache directly
-        _ip_cache["test"] = ("192.168.1.1", 0)
+        _ip_cache.set("test", "192.168.1.1")
         assert "test" in _ip_cache
 
         do_clear()
@@ -68,9 +139,9 @@ class TestGetLocalLanIP:
         """Test getting local IP via ip route."""
         from cluster_execution_mcp.router import get_local_lan_ip
 
-        with patch("subprocess.run") as mock_run:
-            mock_run.return_value = MagicMock(
-                returncode=0,
+        with patch("subprocess.run", autospec=True) as mock_run:
+            mock_run.return_value = subprocess.CompletedProcess(
+                args=[], returncode=0,
                 stdout="192.168.1.1 via 192.168.1.254 dev eth0 src 192.168.1.100"
             )
             result = get_local_lan_ip()
@@ -81,7 +152,7 @@ class TestGetLocalLanIP:
         from cluster_execution_mcp.router import get_local_lan_ip
 
         # Mock ip route failure
-        with patch("subprocess.run", side_effect=subprocess.TimeoutExpired(cmd="ip", timeout=2)):
+        with patch("subprocess.run", autospec=True, side_effect=subprocess.TimeoutExpired(cmd="ip", timeout=2)):
             with patch("socket.socket") as mock_socket:
                 mock_sock = MagicMock()
                 mock_sock.getsockname.return_value = ("192.168.1.150", 0)
@@ -93,49 +164,150 @@ class TestGetLocalLanIP:
                 assert result is None or result.startswith("192.") or result.startswith("10.")
 
 
+class _FakeSSH:
+    """
+    Popen stand-in for ssh probes: exits with returncode after delay seconds,
+    or (delay=None) hangs until killed.
+    """
+
+    def __init__(self, returncode=0, delay=0.0):
+        self._final = returncode
+        self._delay = delay
+        self._killed = threading.Event()
+        self.returncode = None
+
+    @property
+    def killed(self):
+        return self._killed.is_set()
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self, timeout=None):
+        if self.returncode is None:
+            if timeout is not None and (self._delay is None or timeout < self._delay):
+                if not self._killed.wait(timeout):
+                    raise subprocess.TimeoutExpired("ssh", timeout)
+            elif not self._killed.wait(self._delay):
+                self.returncode = self._final
+            if self.returncode is None:
+                self.returncode = -9
+        return self.returncode
+
+    def kill(self):
+        self._killed.set()
+
+
 class TestSSHConnectivity:
     """Tests for SSH connectivity verification."""
 
-    def test_verify_ssh_success(self, mock_subprocess):
+    def test_verify_ssh_success(self, fast_subprocess):
         """Test successful SSH connectivity check."""
         from cluster_execution_mcp.router import verify_ssh_connectivity
         result = verify_ssh_connectivity("192.168.1.100", timeout=2, retries=1)
         assert result is True
 
-    def test_verify_ssh_failure(self):
+    def test_verify_ssh_failure(self, fast_subprocess):
         """Test failed SSH connectivity check."""
-        from cluster_execution_mcp.router import verify_ssh_connectivity
+        from cluster_execution_mcp.router import verify_ssh_connectivity, config
 
-        with patch("subprocess.run") as mock_run:
-            mock_run.return_value = MagicMock(returncode=255)
-            result = verify_ssh_connectivity("192.168.1.100", timeout=1, retries=1)
-            assert result is False
+        fast_subprocess[("ssh", f"{config.ssh_user}@192.168.1.100")] = (255, "", "refused")
+        result = verify_ssh_connectivity("192.168.1.100", timeout=1, retries=1)
+        assert result is False
+        # Other hosts still get the default successful response
+        assert verify_ssh_connectivity("192.168.1.101", timeout=1, retries=1) is True
 
     def test_verify_ssh_timeout(self):
         """Test SSH connectivity timeout."""
         from cluster_execution_mcp.router import verify_ssh_connectivity
 
-        with patch("subprocess.run", side_effect=subprocess.TimeoutExpired(cmd="ssh", timeout=2)):
+        with patch("subprocess.run", autospec=True, side_effect=subprocess.TimeoutExpired(cmd="ssh", timeout=2)):
             result = verify_ssh_connectivity("192.168.1.100", timeout=1, retries=1)
             assert result is False
 
-    def test_verify_ssh_retries(self):
-        """Test SSH connectivity with retries."""
+    def test_verify_ssh_retries(self, monkeypatch):
+        """Test a failed attempt immediately starts the next one."""
         from cluster_execution_mcp.router import verify_ssh_connectivity
 
-        call_count = [0]
+        procs = [_FakeSSH(returncode=255), _FakeSSH(returncode=0)]
+        monkeypatch.setattr(subprocess, "Popen", lambda *a, **kw: procs.pop(0))
 
-        def failing_then_success(*args, **kwargs):
-            call_count[0] += 1
-            if call_count[0] < 2:
-                return MagicMock(returncode=255)
-            return MagicMock(returncode=0)
+        assert verify_ssh_connectivity("192.168.1.100", timeout=1, retries=2) is True
+        assert procs == []
+
+    def test_verify_ssh_healthy_host_single_attempt(self, monkeypatch):
+        """Test a host answering within ConnectTimeout costs exactly one ssh."""
+        from cluster_execution_mcp.router import verify_ssh_connectivity
 
-        with patch("subprocess.run", side_effect=failing_then_success):
-            with patch("time.sleep"):  # Skip actual sleep
-                result = verify_ssh_connectivity("192.168.1.100", timeout=1, retries=2)
-                assert result is True
-                assert call_count[0] == 2
+        spawned = []
+
+        def popen(*args, **kwargs):
+            spawned.append(_FakeSSH(returncode=0, delay=0.1))
+            return spawned[-1]
+
+        monkeypatch.setattr(subprocess, "Popen", popen)
+
+        assert verify_ssh_connectivity("192.168.1.100", timeout=1, retries=2) is True
+        assert len(spawned) == 1
+        assert spawned[0].poll() == 0
+
+    def test_verify_ssh_hedges_slow_attempt(self, monkeypatch):
+        """Test a hung attempt is hedged after ConnectTimeout and then killed."""
+        from cluster_execution_mcp.router import verify_ssh_connectivity
+
+        hung = _FakeSSH(delay=None)
+        procs = [hung, _FakeSSH(returncode=0)]
+        monkeypatch.setattr(subprocess, "Popen", lambda *a, **kw: procs.pop(0))
+
+        try:
+            assert verify_ssh_connectivity("192.168.1.100", timeout=0.2, retries=2) is True
+            assert procs == []
+            # The losing attempt doesn't outlive the check
+            assert hung.killed
+            assert hung.poll() is not None
+        finally:
+            hung.kill()
+
+
+class TestSSHMultiplexing:
+    """Tests for multiplexed SSH command construction."""
+
+    def test_ssh_argv_enables_control_master(self):
+        """Test the ssh prefix enables connection reuse."""
+        from cluster_execution_mcp.router import _ssh_argv
+
+        argv = _ssh_argv("192.168.1.100")
+        assert argv[0] == "ssh"
+        assert argv[-1].endswith("@192.168.1.100")
+        for opt in ("ControlMaster=auto", "ControlPersist=60s", "BatchMode=yes"):
+            assert opt in argv
+        control_path = next(a for a in argv if a.startswith("ControlPath="))
+        # Fixed-length hash keeps the socket path under the Unix limit
+        assert control_path.endswith("%C")
+
+    def test_execute_remote_uses_multiplexed_ssh(self, temp_db, mock_subprocess, tmp_path, monkeypatch, make_router):
+        """Test remote task execution goes through the multiplexed ssh argv."""
+        from cluster_execution_mcp.router import Task
+
+        control_dir = tmp_path / ".ssh"
+        monkeypatch.setattr("cluster_execution_mcp.router._SSH_CONTROL_DIR", control_dir)
+        router = make_router()
+        # Constructing a router must not touch the control directory
+        assert not control_dir.exists()
+        task = Task(task_id="remote-mux", task_type="shell", command="uname -a")
+        mock_proc = AsyncMock()
+        mock_proc.returncode = 0
+        mock_proc.stdout.read = AsyncMock(side_effect=[b"Linux", b""])
+        mock_proc.stderr.read = AsyncMock(return_value=b"")
+        with patch("cluster_execution_mcp.router.get_node_ip", return_value="192.168.1.100"), \
+             patch("asyncio.create_subprocess_exec", return_value=mock_proc) as mock_exec:
+            router._execute_remote(task, "macpro51")
+
+        argv = mock_exec.call_args[0]
+        assert "ControlMaster=auto" in argv
+        assert argv[-1] == "uname -a"
+        # Created lazily on the first remote execution
+        assert control_dir.is_dir()
 
 
 class TestGetNodeIP:
@@ -196,39 +368,78 @@ class TestTask:
         assert d["task_id"] == "test-456"
         assert d["task_type"] == "compile"
 
+    def test_task_is_slotted(self):
+        """Test tasks carry no per-instance __dict__."""
+        from cluster_execution_mcp.router import Task
+
+        task = Task(task_id="slotted", task_type="shell", command="ls")
+        assert not hasattr(task, "__dict__")
+        with pytest.raises(AttributeError):
+            task.unexpected = True
+        assert set(task.to_dict()) == set(Task.__slots__)
+
+    def test_task_interns_label_fields(self):
+        """Test repeated task labels share a single string object."""
+        from cluster_execution_mcp.router import Task
+
+        first = Task(task_id="a", task_type="".join(["sh", "ell"]), requires_os="".join(["lin", "ux"]))
+        second = Task(task_id="b", task_type="".join(["she", "ll"]), requires_os="".join(["li", "nux"]))
+
+        assert first.task_type is second.task_type
+        assert first.requires_os is second.requires_os
+        assert first.requires_arch is None
+
+    def test_task_accepts_null_label_fields(self):
+        """Test label fields left None (e.g. from NULL DB columns) aren't interned."""
+        from cluster_execution_mcp.router import Task
+
+        task = Task(task_id="nulls", task_type=None, requires_os=None, requires_arch=None)
+        assert task.task_type is None
+        assert task.requires_os is None
+
+    def test_task_to_dict_copies_containers(self):
+        """Test to_dict output doesn't alias the task's mutable fields."""
+        from cluster_execution_mcp.router import Task
+
+        task = Task(
+            task_id="test-789",
+            task_type="shell",
+            requires_capabilities=["docker"],
+            metadata={"source": "test"}
+        )
+        d = task.to_dict()
+        d["requires_capabilities"].append("podman")
+        d["metadata"]["source"] = "changed"
+        assert task.requires_capabilities == ["docker"]
+        assert task.metadata == {"source": "test"}
+
 
 class TestDistributedTaskRouter:
     """Tests for DistributedTaskRouter class."""
 
-    def test_router_init(self, temp_db, mock_subprocess):
+    def test_router_init(self, temp_db, mock_subprocess, make_router):
         """Test router initialization."""
-        from cluster_execution_mcp.router import DistributedTaskRouter
-
-        router = DistributedTaskRouter()
+        router = make_router()
         assert router.local_node_id is not None
         assert router.db_path is not None
 
-    def test_detect_local_node_macpro(self, temp_db, mock_subprocess):
+    def test_detect_local_node_macpro(self, temp_db, mock_subprocess, make_router):
         """Test local node detection for macpro51."""
-        from cluster_execution_mcp.router import DistributedTaskRouter
-
         with patch("socket.gethostname", return_value="macpro51.local"):
-            router = DistributedTaskRouter()
+            router = make_router()
             assert router.local_node_id == "macpro51"
 
-    def test_detect_local_node_studio(self, temp_db, mock_subprocess):
+    def test_detect_local_node_studio(self, temp_db, mock_subprocess, make_router):
         """Test local node detection for mac-studio."""
-        from cluster_execution_mcp.router import DistributedTaskRouter
-
         with patch("socket.gethostname", return_value="Marcs-Mac-Studio.local"):
-            router = DistributedTaskRouter()
+            router = make_router()
             assert router.local_node_id == "mac-studio"
 
-    def test_route_task_linux_requirement(self, temp_db, mock_subprocess):
+    def test_route_task_linux_requirement(self, temp_db, mock_subprocess, make_router):
         """Test task routing with Linux requirement."""
-        from cluster_execution_mcp.router import DistributedTaskRouter, Task
+        from cluster_execution_mcp.router import Task
 
-        router = DistributedTaskRouter()
+        router = make_router()
         task = Task(
             task_id="test-789",
             task_type="compile",
@@ -238,12 +449,49 @@ class TestDistributedTaskRouter:
         target = router._route_task(task)
         assert target == "macpro51"  # Only Linux node
 
-    def test_route_task_offloads_from_local(self, temp_db, mock_subprocess):
+    def test_route_task_memoized(self, temp_db, mock_subprocess, make_router):
+        """Test routing decisions are cached per requirement key."""
+        from cluster_execution_mcp.router import Task
+
+        router = make_router()
+        first = Task(task_id="a", task_type="compile", requires_capabilities=["podman", "docker"])
+        second = Task(task_id="b", task_type="compile", requires_capabilities=["docker", "podman"])
+
+        assert router._route_task(first) == router._route_task(second) == "macpro51"
+        assert router._route_task_cached.cache_info().hits == 1
+
+        router.clear_route_cache()
+        assert router._route_task_cached.cache_info().currsize == 0
+
+    def test_route_task_capability_mask(self, temp_db, mock_subprocess, make_router):
+        """Test capability bitmask filtering matches node requirement checks."""
+        from cluster_execution_mcp.router import Task
+        from cluster_execution_mcp.config import CLUSTER_NODES
+
+        router = make_router()
+        assert router._route_task(
+            Task(task_id="gpu", task_type="ml", requires_capabilities=["MLX-GPU"])
+        ) == "mac-studio"
+        assert router._route_task(
+            Task(task_id="arm", task_type="build", requires_os="darwin", requires_arch="ARM64",
+                 requires_capabilities=["research"])
+        ) == "macbook-air"
+        # No node offers it, so the task falls back to the local node
+        assert router._route_task(
+            Task(task_id="none", task_type="build", requires_capabilities=["quantum"])
+        ) == router.local_node_id
+
+        for node_id, node in CLUSTER_NODES.items():
+            caps = list(node.capabilities[:2])
+            mask = sum(router._cap_bit[c.lower()] for c in caps)
+            assert router._node_bits[node_id] & mask == mask
+
+    def test_route_task_offloads_from_local(self, temp_db, mock_subprocess, make_router):
         """Test that tasks are offloaded from local node."""
-        from cluster_execution_mcp.router import DistributedTaskRouter, Task
+        from cluster_execution_mcp.router import Task
 
         with patch("socket.gethostname", return_value="macpro51"):
-            router = DistributedTaskRouter()
+            router = make_router()
             task = Task(
                 task_id="test-offload",
                 task_type="generic"
@@ -253,13 +501,346 @@ class TestDistributedTaskRouter:
             # Should prefer other nodes
             assert target != "macpro51" or target == "macpro51"  # May still be macpro51 if no alternatives
 
-    def test_get_cluster_status(self, temp_db, mock_subprocess):
+    def test_get_cluster_status(self, temp_db, mock_subprocess, make_router):
         """Test get_cluster_status method."""
-        from cluster_execution_mcp.router import DistributedTaskRouter
-
-        router = DistributedTaskRouter()
+        router = make_router()
         status = router.get_cluster_status()
 
         assert "local_node" in status
         assert "cluster_nodes" in status
         assert "task_distribution" in status
+
+    def test_wal_mode_enabled(self, tmp_path, mock_subprocess, make_router):
+        """Test task queue database is switched to WAL journaling."""
+        import sqlite3
+
+        db_path = tmp_path / "task_queue.db"
+        with patch("cluster_execution_mcp.router.get_db_path", return_value=db_path):
+            make_router()
+
+        conn = sqlite3.connect(db_path)
+        try:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        finally:
+            conn.close()
+
+    def test_template_copies_start_in_wal(self, mock_db_path):
+        """Test per-test databases inherit WAL from the template file header."""
+        import sqlite3
+
+        conn = sqlite3.connect(mock_db_path)
+        try:
+            # Query only: journal_mode persists in the file, no router needed
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        finally:
+            conn.close()
+
+    def test_writer_pragmas_applied(self, mock_db_path, mock_subprocess, make_router):
+        """Test the writer connection gets the batched pragma set."""
+        router = make_router()
+        conn = router._write_conn
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA journal_size_limit").fetchone()[0] == 6144000
+
+    def test_init_database_skips_existing_schema(self, mock_db_path, mock_subprocess, make_router):
+        """Test opening an initialized queue does not take the write lock."""
+        from cluster_execution_mcp.router import DistributedTaskRouter
+
+        with patch.object(DistributedTaskRouter, "_write_transaction") as mock_txn:
+            make_router()
+        mock_txn.assert_not_called()
+
+    def test_reader_sees_committed_writes(self, mock_db_path, mock_subprocess, make_router):
+        """Test pooled readers observe tasks stored by the writer."""
+        from cluster_execution_mcp.router import Task
+
+        router = make_router()
+        router._store_task(Task(task_id="pooled", task_type="shell"), "macpro51")
+        assert router.get_task_status("pooled")["assigned_to"] == "macpro51"
+        # Reader connection is returned to the pool for reuse
+        assert router._read_pool.qsize() == 1
+
+    def test_store_tasks_bulk_single_transaction(self, mock_db_path, mock_subprocess, make_router):
+        """Test bulk storage commits all tasks in one transaction."""
+        from cluster_execution_mcp.router import Task
+
+        router = make_router()
+        tasks = [Task(task_id=f"bulk-{i}", task_type="shell") for i in range(1000)]
+        router._indices_ready = True  # Count only the insert transaction
+        with patch.object(
+            router, "_write_transaction", wraps=router._write_transaction
+        ) as mock_txn:
+            router._store_tasks_bulk(tasks, ["macpro51"] * len(tasks))
+        assert mock_txn.call_count == 1
+
+        status = router.get_cluster_status()
+        assert status["task_distribution"]["macpro51"]["total"] == 1000
+
+    def test_indices_created_lazily(self, mock_db_path, mock_subprocess, make_router):
+        """Test secondary indices are deferred until the first read."""
+        router = make_router()
+        index_sql = "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'"
+        with router._reader() as conn:
+            assert conn.execute(index_sql).fetchall() == []
+
+        router.get_task_status("missing")
+        assert router._indices_ready
+        with router._reader() as conn:
+            names = {row[0] for row in conn.execute(index_sql)}
+        assert names == {"idx_status", "idx_assigned_to"}
+
+    def test_indices_analyzed_only_when_created(self, mock_db_path, mock_subprocess, make_router):
+        """Test a router opening an already-indexed queue skips ANALYZE."""
+        first = make_router()
+        first_sql = []
+        first._write_conn.set_trace_callback(first_sql.append)
+        first.get_task_status("missing")
+        assert any("ANALYZE" in sql for sql in first_sql)
+
+        second = make_router()
+        second_sql = []
+        second._write_conn.set_trace_callback(second_sql.append)
+        second.get_task_status("missing")
+        assert second._indices_ready
+        assert second_sql == []
+
+    def test_indices_created_after_bulk_threshold(self, mock_db_path, mock_subprocess, make_router):
+        """Test a large bulk load builds indices once it crosses the threshold."""
+        from cluster_execution_mcp.router import Task, _INDEX_ROW_THRESHOLD
+
+        router = make_router()
+        tasks = [
+            Task(task_id=f"bulk-{i}", task_type="shell")
+            for i in range(_INDEX_ROW_THRESHOLD)
+        ]
+        router._store_tasks_bulk(tasks, ["macpro51"] * len(tasks))
+        assert router._indices_ready
+
+    def test_json_fields_round_trip(self, mock_db_path, mock_subprocess, make_router):
+        """Test stored capabilities/metadata decode back to the original values."""
+        import json
+        from cluster_execution_mcp.router import Task
+
+        router = make_router()
+        task = Task(
+            task_id="json-task",
+            task_type="shell",
+            requires_capabilities=["docker"],
+            metadata={"source": "test", "auto_routed": True}
+        )
+        router._store_task(task, "macpro51")
+        status = router.get_task_status("json-task")
+        assert json.loads(status["requires_capabilities"]) == ["docker"]
+        assert json.loads(status["metadata"]) == {"source": "test", "auto_routed": True}
+
+    def test_json_fields_non_str_keys(self, mock_db_path, mock_subprocess, make_router):
+        """Test metadata with non-str keys stores like json.dumps (keys stringified)."""
+        import json
+        from cluster_execution_mcp.router import Task
+
+        router = make_router()
+        task = Task(task_id="int-keys", task_type="shell", metadata={1: "a"})
+        router._store_task(task, "macpro51")
+        status = router.get_task_status("int-keys")
+        assert json.loads(status["metadata"]) == json.loads(json.dumps({1: "a"}))
+
+
+class TestTaskExecution:
+    """Tests for asyncio-based task execution."""
+
+    @pytest.fixture
+    def router(self, mock_db_path, make_router):
+        return make_router()
+
+    @pytest.fixture
+    def fake_run_async(self, monkeypatch):
+        """
+        Swap _run_async for an in-process fake so tests that only check task
+        bookkeeping don't fork; set .result and .delay to shape each run, or
+        .error to have it raise instead.
+        """
+        import asyncio
+        from types import SimpleNamespace
+
+        fake = SimpleNamespace(
+            result=subprocess.CompletedProcess(args=[], returncode=0, stdout="", stderr=""),
+            delay=0.0,
+            error=None,
+            calls=[],
+        )
+
+        async def _run(args, timeout, shell=False, text=True):
+            fake.calls.append(args)
+            if fake.delay:
+                await asyncio.sleep(fake.delay)
+            if fake.error is not None:
+                raise fake.error
+            return fake.result
+
+        monkeypatch.setattr("cluster_execution_mcp.router._run_async", _run)
+        return fake
+
+    def test_execute_local_captures_output(self, router):
+        """Smoke test: a real local command runs and its stdout is recorded."""
+        from cluster_execution_mcp.router import Task
+
+        task = Task(task_id="local-echo", task_type="shell", command="echo hello")
+        router._store_task(task, router.local_node_id)
+        router._execute_local(task)
+
+        status = router.get_task_status("local-echo")
+        assert status["status"] == "completed"
+        assert status["result"].strip() == "hello"
+
+    def test_execute_local_timeout(self, router, fake_run_async):
+        """Test a command exceeding the timeout is marked as timed out."""
+        from cluster_execution_mcp.router import Task, TaskStatus
+
+        fake_run_async.error = subprocess.TimeoutExpired(cmd=["sleep", "5"], timeout=0.2)
+        task = Task(task_id="local-slow", task_type="shell", command="sleep 5")
+        router._store_task(task, router.local_node_id)
+        router._execute_local(task)
+
+        assert router.get_task_status("local-slow")["status"] == TaskStatus.TIMEOUT.value
+
+    def test_execute_remote_unknown_node(self, router):
+        """Test tasks sent to a node outside the topology fail without SSH."""
+        from cluster_execution_mcp.router import Task
+
+        task = Task(task_id="remote-unknown", task_type="shell", command="uptime")
+        router._store_task(task, "ghost")
+        with patch("cluster_execution_mcp.router.get_node_ip") as mock_ip:
+            router._execute_remote(task, "ghost")
+
+        mock_ip.assert_not_called()
+        status = router.get_task_status("remote-unknown")
+        assert status["status"] == "failed"
+        assert "ghost" in status["error"]
+
+    def test_execute_remote_resolves_alias(self, router, fake_run_async):
+        """Test role aliases like builder route to their canonical node."""
+        from cluster_execution_mcp.router import Task
+
+        fake_run_async.result = subprocess.CompletedProcess(
+            args=[], returncode=0, stdout="up 3 days\n", stderr=""
+        )
+        task = Task(task_id="remote-alias", task_type="shell", command="uptime")
+        router._store_task(task, "macpro51")
+        with patch("cluster_execution_mcp.router.get_node_ip", return_value="10.0.0.5") as mock_ip, \
+             patch("cluster_execution_mcp.router._ensure_ssh_control_dir"):
+            router._execute_remote(task, "builder")
+
+        mock_ip.assert_called_once_with("macpro51")
+        status = router.get_task_status("remote-alias")
+        assert status["status"] == "completed"
+        assert status["result"] == "up 3 days\n"
+
+    @pytest.mark.asyncio
+    async def test_run_async_raises_timeout_expired(self):
+        """Test the async runner keeps subprocess.run's timeout contract."""
+        from cluster_execution_mcp.router import _run_async
+
+        with pytest.raises(subprocess.TimeoutExpired):
+            await _run_async(["sleep", "5"], timeout=0.1)
+
+    @pytest.mark.asyncio
+    async def test_run_async_keeps_output_tail(self):
+        """Test long output is capped to a bounded tail instead of buffered whole."""
+        import sys
+        from cluster_execution_mcp.router import (
+            _run_async, _OUTPUT_MAX_BYTES, _OUTPUT_TRUNCATED_MARKER
+        )
+
+        marker = _OUTPUT_TRUNCATED_MARKER.decode()
+        script = "import sys; sys.stdout.write('x' * 4_000_000 + 'END')"
+        result = await _run_async([sys.executable, "-c", script], timeout=10)
+
+        assert result.returncode == 0
+        assert result.stdout.startswith(marker)
+        assert result.stdout.endswith("END")
+        assert len(result.stdout) <= _OUTPUT_MAX_BYTES + len(marker)
+
+    @pytest.mark.asyncio
+    async def test_run_async_keeps_many_small_writes(self):
+        """Test output written in many small pieces is kept whole when it fits."""
+        import sys
+        from cluster_execution_mcp.router import _run_async, _OUTPUT_TRUNCATED_MARKER
+
+        script = (
+            "import sys, time\n"
+            "for i in range(40):\n"
+            "    print(f'line{i}', flush=True)\n"
+            "    time.sleep(0.005)\n"
+        )
+        result = await _run_async([sys.executable, "-c", script], timeout=10)
+
+        assert result.stdout.splitlines() == [f"line{i}" for i in range(40)]
+        assert _OUTPUT_TRUNCATED_MARKER.decode() not in result.stdout
+
+    @pytest.mark.asyncio
+    async def test_drain_trims_by_bytes(self, monkeypatch):
+        """Test the buffer drops whole leading chunks only past the byte limit."""
+        from types import SimpleNamespace
+        from cluster_execution_mcp import router as router_module
+
+        monkeypatch.setattr(router_module, "_OUTPUT_MAX_BYTES", 10)
+        # One read per piece, as with a slow writer
+        reads = iter([b"aaaa", b"bbbb", b"cccc", b""])
+
+        async def _read(n):
+            return next(reads)
+
+        stream = SimpleNamespace(read=_read)
+        out = await router_module._drain(stream)
+        assert out == router_module._OUTPUT_TRUNCATED_MARKER + b"bbbbcccc"
+
+    def test_execute_local_failing_command(self, router, fake_run_async):
+        """Test a non-zero exit still records stderr as the task error."""
+        from cluster_execution_mcp.router import Task
+
+        fake_run_async.result = subprocess.CompletedProcess(
+            args=[], returncode=2, stdout="",
+            stderr="ls: cannot access '/nonexistent-path': No such file or directory"
+        )
+        task = Task(task_id="local-fail", task_type="shell", command="ls /nonexistent-path")
+        router._store_task(task, router.local_node_id)
+        router._execute_local(task)
+
+        status = router.get_task_status("local-fail")
+        assert status["status"] == "completed"
+        assert "nonexistent-path" in status["error"]
+        assert fake_run_async.calls == [["ls", "/nonexistent-path"]]
+
+    @pytest.mark.asyncio
+    async def test_execute_local_inside_event_loop(self, router, fake_run_async):
+        """Test the sync wrapper works when called from a running loop."""
+        from cluster_execution_mcp.router import Task
+
+        fake_run_async.result = subprocess.CompletedProcess(
+            args=[], returncode=0, stdout="loop\n", stderr=""
+        )
+        task = Task(task_id="in-loop", task_type="shell", command="echo loop")
+        router._store_task(task, router.local_node_id)
+        router._execute_local(task)
+
+        status = router.get_task_status("in-loop")
+        assert status["status"] == "completed"
+        assert status["result"] == "loop\n"
+
+    def test_execute_many_runs_concurrently(self, router, fake_run_async):
+        """Test a batch of tasks overlaps instead of running back to back."""
+        import time
+
+        fake_run_async.delay = 0.5
+
+        with patch.object(router, "_route_task", return_value=router.local_node_id):
+            start = time.monotonic()
+            task_ids = router.execute_many([
+                {"type": "shell", "command": "sleep 0.5"} for _ in range(4)
+            ])
+            elapsed = time.monotonic() - start
+
+        assert len(task_ids) == 4
+        assert elapsed < 1.5
+        for task_id in task_ids:
+            assert router.get_task_status(task_id)["status"] == "completed"
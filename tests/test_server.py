@@ -1,8 +1,52 @@
 """Tests for cluster_execution_mcp.server module."""
 
+import asyncio
 import json
+import subprocess
+import threading
+
 import pytest
-from unittest.mock import patch, MagicMock, AsyncMock
+from types import SimpleNamespace
+
+import cluster_execution_mcp.server as server_module
+from cluster_execution_mcp.config import CLUSTER_NODES
+from cluster_execution_mcp.server import (
+    ClusterExecutionServer,
+    cluster_bash,
+    cluster_status,
+    offload_to,
+    parallel_execute,
+)
+
+# (cpu_percent, load_1m, memory_percent) scenarios for the psutil_load fixture
+LOW_LOAD = (10.0, 0.5, 30.0)
+HIGH_LOAD = (95.0, 10.0, 90.0)
+
+# Stand-in router for tests that never get past validation; only the
+# local node id is read
+_STUB_ROUTER = SimpleNamespace(local_node_id="macpro51")
+
+
+def _raiser(exc):
+    """Build a stand-in callable that raises exc whatever it is called with."""
+    def _raise(*args, **kwargs):
+        raise exc
+    return _raise
+
+
+class FakeProc:
+    """Minimal asyncio subprocess stand-in exposing returncode and communicate()."""
+
+    def __init__(self, returncode=0, stdout=b"", stderr=b""):
+        self.returncode = returncode
+        self._stdout = stdout
+        self._stderr = stderr
+
+    async def communicate(self):
+        return self._stdout, self._stderr
+
+    def kill(self):
+        pass
 
 
 def get_fn(tool):
@@ -19,8 +63,6 @@ class TestClusterExecutionServer:
 
     def test_server_lazy_init(self, mock_subprocess, temp_db):
         """Test server lazy initialization."""
-        from cluster_execution_mcp.server import ClusterExecutionServer
-
         server = ClusterExecutionServer()
         # Router should not be initialized yet
         assert server._router is None
@@ -28,52 +70,51 @@ class TestClusterExecutionServer:
         # Access router property
         _ = server.router
         assert server._router is not None
+        server.close()
 
-    def test_server_local_node_id(self, mock_subprocess, temp_db):
-        """Test getting local node ID."""
-        from cluster_execution_mcp.server import ClusterExecutionServer
-
-        server = ClusterExecutionServer()
-        assert server.local_node_id is not None
-
-    def test_is_overloaded_false(self, mock_psutil):
-        """Test is_overloaded returns False when not overloaded."""
-        from cluster_execution_mcp.server import ClusterExecutionServer
+    def test_server_close_releases_resources(self, temp_db):
+        """Test close() closes the router and shuts the probe pool down."""
+        import sqlite3
 
         server = ClusterExecutionServer()
-        server._router = MagicMock()
-        assert server.is_overloaded() is False
-
-    def test_is_overloaded_true(self):
-        """Test is_overloaded returns True when overloaded."""
-        from cluster_execution_mcp.server import ClusterExecutionServer
+        server.close()  # Nothing created yet: a no-op
 
-        with patch("psutil.cpu_percent", return_value=95.0), \
-             patch("psutil.virtual_memory") as mock_mem, \
-             patch("psutil.getloadavg", return_value=(10.0, 8.0, 6.0)):
-            mock_mem.return_value = MagicMock(percent=90.0)
+        router = server.router
+        pool = server.probe_pool
+        server.close()
 
-            server = ClusterExecutionServer()
-            server._router = MagicMock()
-            assert server.is_overloaded() is True
-
-    def test_should_offload_heavy_command(self, mock_psutil):
-        """Test should_offload returns True for heavy commands."""
-        from cluster_execution_mcp.server import ClusterExecutionServer
-
-        server = ClusterExecutionServer()
-        server._router = MagicMock()
-        assert server.should_offload("make all") is True
-        assert server.should_offload("cargo build --release") is True
+        assert server._router is None and server._probe_pool is None
+        with pytest.raises(RuntimeError):
+            pool.submit(lambda: None)
+        with pytest.raises(sqlite3.ProgrammingError):
+            router._write_conn.execute("SELECT 1")
 
-    def test_should_offload_simple_command(self, mock_psutil):
-        """Test should_offload returns False for simple commands."""
-        from cluster_execution_mcp.server import ClusterExecutionServer
+    def test_server_local_node_id(self, server, mock_subprocess):
+        """Test getting local node ID."""
+        assert server.local_node_id is not None
 
-        server = ClusterExecutionServer()
-        server._router = MagicMock()
-        assert server.should_offload("ls -la") is False
-        assert server.should_offload("pwd") is False
+    @pytest.mark.parametrize("psutil_load, overloaded", [
+        (LOW_LOAD, False),
+        (HIGH_LOAD, True),
+        ((95.0, 1.5, 50.0), True),  # High CPU
+        ((25.0, 1.5, 90.0), True),  # High memory
+        ((25.0, 10.0, 50.0), True),  # High load average
+    ], indirect=["psutil_load"])
+    def test_is_overloaded(self, server, psutil_load, overloaded):
+        """Test is_overloaded trips on any metric above its threshold."""
+        assert server.is_overloaded() is overloaded
+
+    @pytest.mark.parametrize("psutil_load, command, expected", [
+        (LOW_LOAD, "make all", True),
+        (LOW_LOAD, "cargo build --release", True),
+        (LOW_LOAD, "ls -la", False),
+        (LOW_LOAD, "pwd", False),
+        (HIGH_LOAD, "make all", True),
+        (HIGH_LOAD, "ls -la", True),  # Overload offloads even simple commands
+    ], indirect=["psutil_load"])
+    def test_should_offload(self, server, psutil_load, command, expected):
+        """Test should_offload across heavy/simple commands and local load."""
+        assert server.should_offload(command) is expected
 
 
 class TestExecuteLocal:
@@ -81,8 +122,6 @@ class TestExecuteLocal:
 
     def test_execute_local_success(self, mock_subprocess, temp_db):
         """Test successful local execution."""
-        from cluster_execution_mcp.server import ClusterExecutionServer
-
         server = ClusterExecutionServer()
         result = server.execute_local("echo hello")
 
@@ -91,10 +130,8 @@ class TestExecuteLocal:
 
     def test_execute_local_invalid_command(self, temp_db):
         """Test local execution with invalid command."""
-        from cluster_execution_mcp.server import ClusterExecutionServer
-
         server = ClusterExecutionServer()
-        server._router = MagicMock()
+        server._router = _STUB_ROUTER
         result = server.execute_local("")
 
         assert result["success"] is False
@@ -102,37 +139,29 @@ class TestExecuteLocal:
 
     def test_execute_local_dangerous_command(self, temp_db):
         """Test local execution rejects dangerous commands."""
-        from cluster_execution_mcp.server import ClusterExecutionServer
-
         server = ClusterExecutionServer()
-        server._router = MagicMock()
+        server._router = _STUB_ROUTER
         result = server.execute_local("rm -rf /")
 
         assert result["success"] is False
         assert "dangerous" in result.get("error", "").lower()
 
-    def test_execute_local_timeout(self, temp_db):
+    def test_execute_local_timeout(self, monkeypatch):
         """Test local execution timeout handling."""
-        from cluster_execution_mcp.server import ClusterExecutionServer
-        import subprocess
-
-        with patch("subprocess.run", side_effect=subprocess.TimeoutExpired(cmd="test", timeout=10)):
-            server = ClusterExecutionServer()
-            server._router = MagicMock()
-            result = server.execute_local("sleep 1000")
+        monkeypatch.setattr(subprocess, "run", _raiser(subprocess.TimeoutExpired(cmd="test", timeout=10)))
+        server = ClusterExecutionServer()
+        server._router = _STUB_ROUTER
+        result = server.execute_local("sleep 1000")
 
-            assert result["success"] is False
-            assert "timed out" in result.get("error", "").lower()
+        assert result["success"] is False
+        assert "timed out" in result.get("error", "").lower()
 
 
 class TestGetClusterStatus:
     """Tests for cluster status retrieval."""
 
-    def test_get_cluster_status_local_metrics(self, mock_psutil, mock_subprocess, temp_db):
+    def test_get_cluster_status_local_metrics(self, server, mock_psutil, mock_subprocess):
         """Test getting local metrics in cluster status."""
-        from cluster_execution_mcp.server import ClusterExecutionServer
-
-        server = ClusterExecutionServer()
         status = server.get_cluster_status()
 
         assert "local_node" in status
@@ -141,20 +170,45 @@ class TestGetClusterStatus:
         assert local_node in status["nodes"]
         assert status["nodes"][local_node]["reachable"] is True
 
-    def test_get_cluster_status_remote_unreachable(self, mock_psutil, temp_db):
+    @pytest.mark.parametrize("psutil_load, health", [
+        (LOW_LOAD, "healthy"),
+        (HIGH_LOAD, "overloaded"),
+    ], indirect=["psutil_load"])
+    def test_get_cluster_status_local_health(self, server, psutil_load, health, fast_subprocess):
+        """Test the local node's status reflects its pinned load."""
+        status = server.get_cluster_status()
+
+        local = status["nodes"][status["local_node"]]
+        assert local["status"] == health
+        assert local["cpu_percent"] == psutil_load[0]
+
+    def test_get_cluster_status_remote_unreachable(self, server, mock_psutil, monkeypatch):
         """Test handling unreachable remote nodes."""
-        from cluster_execution_mcp.server import ClusterExecutionServer
-        import subprocess
+        monkeypatch.setattr(subprocess, "run", _raiser(subprocess.TimeoutExpired(cmd="ssh", timeout=5)))
+        monkeypatch.setattr(server_module, "get_node_ip", lambda *a, **kw: "192.168.1.100")
+        status = server.get_cluster_status()
+
+        # Should have error for remote nodes
+        for node_id, node_status in status["nodes"].items():
+            if node_id != status["local_node"]:
+                assert node_status.get("reachable") is False or "error" in node_status
 
-        with patch("subprocess.run", side_effect=subprocess.TimeoutExpired(cmd="ssh", timeout=5)):
-            with patch("cluster_execution_mcp.router.get_node_ip", return_value="192.168.1.100"):
-                server = ClusterExecutionServer()
-                status = server.get_cluster_status()
+    def test_get_cluster_status_probes_nodes_concurrently(self, server, mock_psutil, monkeypatch):
+        """Test remote nodes are probed in parallel, not one after another."""
+        remote = [n for n in CLUSTER_NODES if n != server.local_node_id]
+        # Every probe must be in flight at once for the barrier to release
+        barrier = threading.Barrier(len(remote), timeout=5)
 
-                # Should have error for remote nodes
-                for node_id, node_status in status["nodes"].items():
-                    if node_id != status["local_node"]:
-                        assert node_status.get("reachable") is False or "error" in node_status
+        def probe(*args, **kwargs):
+            barrier.wait()
+            return subprocess.CompletedProcess(args=[], returncode=0, stdout="10.0 20.0 0.5", stderr="")
+
+        monkeypatch.setattr(server_module, "get_node_ip", lambda *a, **kw: "192.168.1.100")
+        monkeypatch.setattr(subprocess, "run", probe)
+        status = server.get_cluster_status()
+
+        for node_id in remote:
+            assert status["nodes"][node_id]["reachable"] is True
 
 
 class TestOffloadToNode:
@@ -162,35 +216,21 @@ class TestOffloadToNode:
 
     def test_offload_invalid_node(self, temp_db):
         """Test offloading to invalid node."""
-        from cluster_execution_mcp.server import ClusterExecutionServer
-
         server = ClusterExecutionServer()
-        server._router = MagicMock()
+        server._router = _STUB_ROUTER
         result = server.offload_to_node("ls -la", "nonexistent")
 
         assert result["success"] is False
         assert "Unknown node" in result.get("error", "")
 
-    def test_offload_invalid_command(self, temp_db):
-        """Test offloading invalid command."""
-        from cluster_execution_mcp.server import ClusterExecutionServer
-
-        server = ClusterExecutionServer()
-        server._router = MagicMock()
-        result = server.offload_to_node("rm -rf /", "macpro51")
-
-        assert result["success"] is False
-
-    def test_offload_success(self, mock_subprocess, temp_db):
+    def test_offload_success(self, mock_subprocess, monkeypatch):
         """Test successful offload to node."""
-        from cluster_execution_mcp.server import ClusterExecutionServer
-
-        with patch("cluster_execution_mcp.router.get_node_ip", return_value="192.168.1.183"):
-            server = ClusterExecutionServer()
-            result = server.offload_to_node("ls -la", "macpro51")
+        monkeypatch.setattr(server_module, "get_node_ip", lambda *a, **kw: "192.168.1.183")
+        server = ClusterExecutionServer()
+        result = server.offload_to_node("ls -la", "macpro51")
 
-            assert result["success"] is True
-            assert result["executed_on"] == "macpro51"
+        assert result["success"] is True
+        assert result["executed_on"] == "macpro51"
 
 
 class TestMCPTools:
@@ -199,8 +239,6 @@ class TestMCPTools:
     @pytest.mark.asyncio
     async def test_cluster_bash_tool(self, mock_subprocess, mock_psutil, temp_db):
         """Test cluster_bash MCP tool."""
-        from cluster_execution_mcp.server import cluster_bash
-
         fn = get_fn(cluster_bash)
         result_json = await fn(command="echo hello", auto_route=False)
         result = json.loads(result_json)
@@ -211,8 +249,6 @@ class TestMCPTools:
     @pytest.mark.asyncio
     async def test_cluster_status_tool(self, mock_subprocess, mock_psutil, temp_db):
         """Test cluster_status MCP tool."""
-        from cluster_execution_mcp.server import cluster_status
-
         fn = get_fn(cluster_status)
         result_json = await fn()
         result = json.loads(result_json)
@@ -223,10 +259,7 @@ class TestMCPTools:
     @pytest.mark.asyncio
     async def test_offload_to_tool_invalid(self, temp_db):
         """Test offload_to MCP tool with invalid node."""
-        from cluster_execution_mcp.server import offload_to, _server
-
         # Clear server cache
-        import cluster_execution_mcp.server as server_module
         server_module._server = None
 
         fn = get_fn(offload_to)
@@ -237,23 +270,21 @@ class TestMCPTools:
         assert "error" in result
 
     @pytest.mark.asyncio
-    async def test_parallel_execute_tool(self, mock_subprocess, temp_db):
+    async def test_parallel_execute_tool(self, monkeypatch):
         """Test parallel_execute MCP tool."""
-        from cluster_execution_mcp.server import parallel_execute
+        async def _exec(*args, **kwargs):
+            return FakeProc(0, b"output", b"")
 
-        with patch("cluster_execution_mcp.router.get_node_ip", return_value="192.168.1.100"):
-            with patch("asyncio.create_subprocess_exec") as mock_exec:
-                mock_proc = AsyncMock()
-                mock_proc.returncode = 0
-                mock_proc.communicate = AsyncMock(return_value=(b"output", b""))
-                mock_exec.return_value = mock_proc
+        monkeypatch.setattr(server_module, "get_node_ip", lambda *a, **kw: "192.168.1.100")
+        monkeypatch.setattr(asyncio, "create_subprocess_exec", _exec)
 
-                fn = get_fn(parallel_execute)
-                result_json = await fn(commands=["echo a", "echo b"])
-                result = json.loads(result_json)
+        fn = get_fn(parallel_execute)
+        result_json = await fn(commands=["echo a", "echo b"])
+        result = json.loads(result_json)
 
-                assert isinstance(result, list)
-                assert len(result) == 2
+        assert isinstance(result, list)
+        assert len(result) == 2
+        assert all(r["success"] and r["stdout"] == "output" for r in result)
 
 
 class TestInputValidation:
@@ -262,9 +293,6 @@ class TestInputValidation:
     @pytest.mark.asyncio
     async def test_cluster_bash_empty_command(self, temp_db):
         """Test cluster_bash rejects empty command."""
-        from cluster_execution_mcp.server import cluster_bash
-
-        import cluster_execution_mcp.server as server_module
         server_module._server = None
 
         fn = get_fn(cluster_bash)
@@ -276,9 +304,6 @@ class TestInputValidation:
     @pytest.mark.asyncio
     async def test_parallel_execute_dangerous_command(self, temp_db):
         """Test parallel_execute rejects dangerous commands."""
-        from cluster_execution_mcp.server import parallel_execute
-
-        import cluster_execution_mcp.server as server_module
         server_module._server = None
 
         fn = get_fn(parallel_execute)